@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import bridge
+
+SIMULATOR_PATH = Path(__file__).resolve().with_name("mdc_simulator.py")
+SCENARIOS = ("action_sweep", "main_sweep", "main_mixed", "http_sweep", "http_mixed")
+# Reads the mixed workload picks from; all are served by the simulator.
+MIXED_CLI_COMMANDS = ("volume", "brightness", "serial_number", "model_name", "sharpness")
+# Compared against a baseline; latency may grow and throughput shrink by the tolerance.
+GATED_LATENCY = "p95"
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(ordered) + errors,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round((len(ordered) + errors) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    for percentile in (50, 95, 99):
+        rank = max(1, -(-percentile * len(ordered) // 100))
+        summary[f"p{percentile}"] = round(ordered[rank - 1] * 1000, 2) if ordered else None
+    summary["max"] = round(ordered[-1] * 1000, 2) if ordered else None
+    return summary
+
+
+class SimulatorProcess:
+    """Runs ``mdc_simulator.py`` in a child process, so device replies do not share our GIL."""
+
+    def __init__(self, options: argparse.Namespace):
+        self.options = options
+        self.process: subprocess.Popen | None = None
+
+    def __enter__(self) -> "SimulatorProcess":
+        command = [
+            sys.executable,
+            str(SIMULATOR_PATH),
+            "--count", str(self.options.displays),
+            "--base-port", str(self.options.base_port),
+            "--latency-ms", str(self.options.latency_ms),
+            "--jitter-ms", str(self.options.jitter_ms),
+            "--drop-rate", str(self.options.drop_rate),
+            "--seed", str(self.options.seed),
+        ]
+        if self.options.serialize:
+            command.append("--serialize")
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        ready = json.loads(self.process.stdout.readline() or "{}")
+        if ready.get("event") != "ready":
+            self.process.kill()
+            raise RuntimeError("MDC simulator did not start")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.process.terminate()
+        self.process.wait(timeout=5)
+
+    @property
+    def targets(self) -> list[dict]:
+        return [
+            {"ip": "127.0.0.1", "port": self.options.base_port + index, "display_id": 0}
+            for index in range(self.options.displays)
+        ]
+
+
+def sweep_requests(targets: list[dict], rounds: int) -> list[tuple[str, dict]]:
+    # max_age 0: every status read goes to the display, like a periodic sweep.
+    return [("status", {**target, "max_age": 0}) for _round in range(rounds) for target in targets]
+
+
+def mixed_requests(targets: list[dict], count: int, rng: random.Random) -> list[tuple[str, dict]]:
+    """Operator-like traffic: mostly status reads (cache allowed), some CLI reads and setters."""
+    requests = []
+    for _index in range(count):
+        target = dict(rng.choice(targets))
+        roll = rng.random()
+        if roll < 0.70:
+            requests.append(("status", target))
+        elif roll < 0.85:
+            requests.append(("cli_get", {**target, "command": rng.choice(MIXED_CLI_COMMANDS)}))
+        elif roll < 0.95:
+            requests.append(("set_volume", {**target, "value": rng.randint(0, 100)}))
+        else:
+            requests.append(("snapshot", {**target, "commands": list(MIXED_CLI_COMMANDS)}))
+    return requests
+
+
+async def _run_async(requests: list[tuple[str, dict]], concurrency: int, call) -> dict:
+    limit = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(action: str, payload: dict) -> None:
+        nonlocal errors
+        async with limit:
+            started = time.perf_counter()
+            try:
+                result = await call(action, payload)
+            except Exception:
+                errors += 1
+                return
+            if isinstance(result, dict) and result.get("ok") is False:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(action, payload) for action, payload in requests))
+    finally:
+        await bridge.CONNECTION_POOL.close()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_in_process(requests: list[tuple[str, dict]], concurrency: int, through_main: bool) -> dict:
+    async def call_action(action: str, payload: dict):
+        # The device path without the cache, action timeout or response envelope.
+        return await bridge.do_signage_action(action, payload)
+
+    call = bridge.main_async if through_main else call_action
+    return asyncio.run(_run_async(requests, concurrency, call))
+
+
+def run_http(requests: list[tuple[str, dict]], concurrency: int) -> dict:
+    """POST every request to ``/device_action`` of an in-process backend, keep-alive per thread."""
+    import web_backend
+
+    class QuietHandler(web_backend.Handler):
+        def log_message(self, format, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), QuietHandler)
+    threading.Thread(target=server.serve_forever, name="bench-backend", daemon=True).start()
+    port = server.server_address[1]
+    local = threading.local()
+
+    def post(request: tuple[str, dict]) -> float | None:
+        action, payload = request
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        body = json.dumps({"action": action, "payload": payload}).encode("utf-8")
+        started = time.perf_counter()
+        try:
+            conn.request("POST", "/device_action", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            data = json.loads(response.read())
+        except (OSError, http.client.HTTPException, ValueError):
+            conn.close()
+            local.conn = None
+            return None
+        if response.status != 200 or not data.get("ok"):
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-client") as pool:
+            outcomes = list(pool.map(post, requests))
+    finally:
+        server.shutdown()
+        server.server_close()
+    elapsed = time.perf_counter() - started
+    latencies = [outcome for outcome in outcomes if outcome is not None]
+    return summarize(latencies, len(outcomes) - len(latencies), elapsed)
+
+
+def run_scenario(name: str, targets: list[dict], options: argparse.Namespace) -> dict:
+    rng = random.Random(options.seed)
+    sweep = sweep_requests(targets, options.rounds)
+    mixed = mixed_requests(targets, options.requests, rng)
+    if name == "action_sweep":
+        return run_in_process(sweep, options.concurrency, through_main=False)
+    if name == "main_sweep":
+        return run_in_process(sweep, options.concurrency, through_main=True)
+    if name == "main_mixed":
+        return run_in_process(mixed, options.concurrency, through_main=True)
+    if name == "http_sweep":
+        return run_http(sweep, options.concurrency)
+    if name == "http_mixed":
+        return run_http(mixed, options.concurrency)
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of ``results`` against ``baseline`` beyond ``tolerance`` (0.2 = 20%)."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']} rps < baseline {previous['throughput_rps']} rps"
+            )
+        if previous.get(GATED_LATENCY) and current.get(GATED_LATENCY) is not None:
+            if current[GATED_LATENCY] > previous[GATED_LATENCY] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {GATED_LATENCY} {current[GATED_LATENCY]} ms > baseline {previous[GATED_LATENCY]} ms"
+                )
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: {current['errors']} errors > baseline {previous['errors']}")
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Bridge throughput and tail latency against simulated displays")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated; default: all")
+    parser.add_argument("--displays", type=int, default=100)
+    parser.add_argument("--base-port", type=int, default=15200)
+    parser.add_argument("--rounds", type=int, default=3, help="sweeps over every display per sweep scenario")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per mixed scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--serialize", action="store_true", help="simulated displays run one command at a time")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser
+
+
+def main() -> None:
+    options = build_parser().parse_args()
+    names = [name.strip() for name in options.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    results = {}
+    print(f"{'scenario':<14} {'requests':>8} {'errors':>6} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    with SimulatorProcess(options) as simulator:
+        for name in names:
+            result = run_scenario(name, simulator.targets, options)
+            results[name] = result
+            print(
+                f"{name:<14} {result['requests']:>8} {result['errors']:>6} {result['throughput_rps']:>9} "
+                f"{result['p50']!s:>8} {result['p95']!s:>8} {result['p99']!s:>8}"
+            )
+
+    if options.json_path:
+        report = {"options": {k: v for k, v in vars(options).items() if k not in {"json_path", "baseline"}}}
+        Path(options.json_path).write_text(json.dumps({**report, "results": results}, indent=2), encoding="utf-8")
+
+    if options.baseline:
+        baseline = json.loads(Path(options.baseline).read_text(encoding="utf-8")).get("results", {})
+        regressions = compare(results, baseline, options.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
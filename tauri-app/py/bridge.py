@@ -1,6 +1,15 @@
 import asyncio
+import contextvars
+import copy
+import heapq
+import ipaddress
+import itertools
 import json
+import os
+import random
 import sys
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 if not getattr(sys, "frozen", False):
@@ -9,6 +18,28 @@ if not getattr(sys, "frozen", False):
         sys.path.insert(0, str(ROOT_DIR))
 
 from samsung_mdc import MDC
+from samsung_mdc.exceptions import MDCResponseError, MDCTimeoutError, NAKError
+
+try:
+    from metrics import METRICS
+except ImportError:
+    # bridge.py also runs on its own (desktop shell, bridge.exe), where nothing scrapes metrics.
+    class _DisabledMetrics:
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: None
+
+    METRICS = _DisabledMetrics()
+
+# Phase timings (ms) of the current traced call; main_async sets a dict when a trace_id is given.
+_action_spans: contextvars.ContextVar[dict | None] = contextvars.ContextVar("mdc_action_spans", default=None)
+
+
+def _record_phase(action: str, phase: str, seconds: float) -> None:
+    METRICS.observe("mdc_phase_duration_seconds", (action, phase), seconds)
+    spans = _action_spans.get()
+    if spans is not None:
+        spans[f"mdc_{phase}"] = spans.get(f"mdc_{phase}", 0.0) + seconds * 1000
+
 
 POWER_MAP = {0: "OFF", 1: "ON", 2: "REBOOT"}
 MUTE_MAP = {0: "OFF", 1: "ON", 255: "UNAVAILABLE"}
@@ -32,6 +63,51 @@ TIMER_INDEXED_COMMANDS = {"timer_13", "timer_15"}
 DEFAULT_TIMEOUT_SECONDS = 20.0
 MIN_TIMEOUT_SECONDS = 3.0
 MAX_TIMEOUT_SECONDS = 60.0
+POOL_IDLE_TIMEOUT_SECONDS = float(os.getenv("MDC_POOL_IDLE_TIMEOUT_SECONDS", "30"))
+# Samsung displays handle parallel sessions badly, so one session per host by default.
+POOL_MAX_SESSIONS_PER_HOST = int(os.getenv("MDC_POOL_MAX_SESSIONS_PER_HOST", "1"))
+BULK_MAX_CONCURRENCY = int(os.getenv("MDC_BULK_MAX_CONCURRENCY", "32"))
+BULK_PER_HOST_CONCURRENCY = int(os.getenv("MDC_BULK_PER_HOST_CONCURRENCY", "1"))
+NON_BULK_ACTIONS = {"bulk", "cli_catalog", "device_health", "discover"}
+DISCOVERY_CONCURRENCY = int(os.getenv("MDC_DISCOVERY_CONCURRENCY", "256"))
+DISCOVERY_MAX_HOSTS = int(os.getenv("MDC_DISCOVERY_MAX_HOSTS", "4096"))
+DISCOVERY_PROBE_TIMEOUT_SECONDS = float(os.getenv("MDC_DISCOVERY_PROBE_TIMEOUT_SECONDS", "0.8"))
+# MDC reads used to confirm that an open port is a Samsung display.
+IDENTIFY_COMMANDS = ("model_name", "serial_number")
+# Adaptive per-host limits: EWMA latency + 4 deviations, clamped to these bounds.
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("MDC_CONNECT_TIMEOUT_SECONDS", "1.0"))
+CONNECT_TIMEOUT_MIN_SECONDS = float(os.getenv("MDC_CONNECT_TIMEOUT_MIN_SECONDS", "0.3"))
+RESPONSE_TIMEOUT_SECONDS = float(os.getenv("MDC_RESPONSE_TIMEOUT_SECONDS", "5"))
+RESPONSE_TIMEOUT_MIN_SECONDS = float(os.getenv("MDC_RESPONSE_TIMEOUT_MIN_SECONDS", "1.0"))
+# Reads have a stable latency profile; setters (power on in particular) may take longer.
+ADAPTIVE_RESPONSE_ACTIONS = {"status", "cli_get", "snapshot"}
+# Actions that never change display state (no cache write-through).
+READ_ONLY_ACTIONS = {"status", "cli_get", "snapshot"}
+# Consecutive connect failures that open a host's circuit; probes then back off exponentially.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("MDC_BREAKER_FAILURES", "3"))
+BREAKER_OPEN_SECONDS = float(os.getenv("MDC_BREAKER_OPEN_SECONDS", "5"))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv("MDC_BREAKER_MAX_OPEN_SECONDS", "300"))
+# Commands waiting for one ip:port beyond this are rejected instead of queued.
+DEVICE_QUEUE_DEPTH = int(os.getenv("MDC_DEVICE_QUEUE_DEPTH", "64"))
+# Lower value runs first; operator actions default to interactive, bulk sweeps to background.
+PRIORITY_LANES = {"interactive": 0, "background": 1}
+# Read-only actions whose identical concurrent requests share one device round trip.
+COALESCED_ACTIONS = {"status", "cli_get"}
+# Seconds a status/cli_get read is served from memory; 0 disables the cache.
+CACHE_TTL_SECONDS = float(os.getenv("MDC_CACHE_TTL_SECONDS", "2"))
+# Per-command TTLs, e.g. "status=5,serial_number=3600,timer_13=60".
+CACHE_TTL_OVERRIDES = os.getenv("MDC_CACHE_TTL_OVERRIDES", "").strip()
+CACHE_MAX_DEVICES = int(os.getenv("MDC_CACHE_MAX_DEVICES", "4096"))
+# Setter action -> (decode_status field, matching cli command, payload key, label map).
+WRITE_THROUGH_FIELDS = {
+    "power": ("power", "power", "state", POWER_MAP),
+    "set_volume": ("volume", "volume", "value", None),
+    "set_mute": ("mute", "mute", "state", MUTE_MAP),
+    "set_input": ("input_source", "input_source", "source", INPUT_SOURCE_MAP),
+    "set_brightness": (None, "brightness", "value", None),
+}
+# cli commands whose values are also part of the decoded status.
+STATUS_FIELD_COMMANDS = {"power", "volume", "mute", "input_source", "picture_aspect"}
 
 
 def _field_placeholder(field) -> str:
@@ -162,6 +238,16 @@ def decode_status(raw_status):
     }
 
 
+async def probe_tcp(ip: str, port: int = 1515, timeout: float = 0.8) -> bool:
+    """Return True when a TCP connection to ``ip:port`` opens within ``timeout`` seconds."""
+    try:
+        _reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
 def resolve_protocol(protocol: str, port: int) -> str:
     normalized = str(protocol or "AUTO").strip().upper()
     if normalized == "SIGNAGE_MDC":
@@ -182,6 +268,10 @@ def resolve_action_timeout(action: str, payload: dict) -> float:
         except Exception:
             pass
 
+    if action == "snapshot":
+        commands = payload.get("commands")
+        count = len(commands) if isinstance(commands, list) else 1
+        return min(MAX_TIMEOUT_SECONDS, 10.0 + 1.0 * count)
     if action in {"status", "cli_get", "cli_set"}:
         return 25.0
     if action in {"power", "set_volume", "set_brightness", "set_mute", "set_input"}:
@@ -189,124 +279,1282 @@ def resolve_action_timeout(action: str, payload: dict) -> float:
     return DEFAULT_TIMEOUT_SECONDS
 
 
+class HostLatencyTracker:
+    """Smoothed connect and response latency per ``ip:port`` (TCP RTO style estimate).
+
+    A timeout doubles the limit for that host and kind until the next measured sample,
+    so a display that became slower than its history is not failed at the old limit forever.
+    """
+
+    ALPHA = 0.125
+    BETA = 0.25
+
+    def __init__(self):
+        # key -> kind ("connect" | "response") -> (smoothed seconds, deviation seconds, samples)
+        self._stats: dict[str, dict[str, tuple[float, float, int]]] = {}
+        # key -> kind -> backed-off limit in seconds, cleared by the next sample
+        self._backoff: dict[str, dict[str, float]] = {}
+
+    def record(self, key: str, kind: str, seconds: float) -> None:
+        backoff = self._backoff.get(key)
+        if backoff:
+            backoff.pop(kind, None)
+        host = self._stats.setdefault(key, {})
+        previous = host.get(kind)
+        if previous is None:
+            host[kind] = (seconds, seconds / 2, 1)
+            return
+        smoothed, deviation, samples = previous
+        deviation = (1 - self.BETA) * deviation + self.BETA * abs(smoothed - seconds)
+        smoothed = (1 - self.ALPHA) * smoothed + self.ALPHA * seconds
+        host[kind] = (smoothed, deviation, samples + 1)
+
+    def record_timeout(self, key: str, kind: str, limit: float) -> None:
+        """Back off after an operation hit ``limit`` seconds without completing."""
+        host = self._backoff.setdefault(key, {})
+        host[kind] = max(host.get(kind, 0.0), 2 * limit)
+
+    def timeout(self, key: str, kind: str, minimum: float, maximum: float) -> float:
+        """Return the adaptive timeout, or ``maximum`` while the host has no history."""
+        stats = self._stats.get(key, {}).get(kind)
+        if stats is None:
+            return maximum
+        smoothed, deviation, _samples = stats
+        limit = max(smoothed + 4 * deviation, self._backoff.get(key, {}).get(kind, 0.0))
+        return min(max(limit, minimum), maximum)
+
+    def snapshot(self) -> dict[str, dict]:
+        snapshot = {}
+        for key, host in self._stats.items():
+            backoff = self._backoff.get(key, {})
+            snapshot[key] = {
+                kind: {"avg_s": round(smoothed, 4), "dev_s": round(deviation, 4), "samples": samples}
+                for kind, (smoothed, deviation, samples) in host.items()
+            }
+            for kind, limit in backoff.items():
+                if kind in snapshot[key]:
+                    snapshot[key][kind]["backoff_s"] = round(limit, 4)
+        return snapshot
+
+
+HOST_LATENCY = HostLatencyTracker()
+
+
+def resolve_device_timeouts(action: str, payload: dict, key: str) -> tuple[float, float]:
+    """Return ``(connect_s, response_s)`` for one MDC operation against ``key``.
+
+    An explicit ``timeout_s`` keeps the library's fixed limits (bounded by that budget);
+    otherwise both limits follow the host's observed latency.
+    """
+    explicit_timeout = payload.get("timeout_s")
+    if explicit_timeout is not None:
+        budget = resolve_action_timeout(action, payload)
+        return min(budget, RESPONSE_TIMEOUT_SECONDS), min(budget, RESPONSE_TIMEOUT_SECONDS)
+
+    connect_s = HOST_LATENCY.timeout(key, "connect", CONNECT_TIMEOUT_MIN_SECONDS, CONNECT_TIMEOUT_SECONDS)
+    if action not in ADAPTIVE_RESPONSE_ACTIONS:
+        return connect_s, RESPONSE_TIMEOUT_SECONDS
+    response_s = HOST_LATENCY.timeout(
+        key, "response", RESPONSE_TIMEOUT_MIN_SECONDS, RESPONSE_TIMEOUT_SECONDS
+    )
+    return connect_s, response_s
+
+
+class HostUnreachableError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Per ``ip:port`` circuit over connection attempts.
+
+    ``failure_threshold`` consecutive connect failures open the circuit: requests fail
+    at once until the open period ends, then one half-open request may try to connect.
+    Success closes the circuit; failure reopens it for twice as long (up to ``max_open_s``).
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        open_s: float = BREAKER_OPEN_SECONDS,
+        max_open_s: float = BREAKER_MAX_OPEN_SECONDS,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_s = open_s
+        self.max_open_s = max(open_s, max_open_s)
+        self._hosts: dict[str, dict] = {}
+
+    def before_request(self, key: str) -> None:
+        host = self._hosts.get(key)
+        if host is None or host["state"] == "closed":
+            return
+        now = time.monotonic()
+        if host["state"] == "open" and now >= host["open_until"]:
+            host["state"] = "half_open"
+            host["probe_started"] = now
+            return
+        # A probe that never reported back (cancelled before connecting) frees the slot.
+        if host["state"] == "half_open" and now - host["probe_started"] > CONNECT_TIMEOUT_SECONDS * 2 + 1:
+            host["probe_started"] = now
+            return
+        retry_in = max(0.0, host["open_until"] - now)
+        raise HostUnreachableError(
+            f"MDC host {key} unreachable (circuit {host['state']}, next probe in {retry_in:.1f}s): "
+            f"{host['last_error']}"
+        )
+
+    def record_success(self, key: str) -> None:
+        self._hosts.pop(key, None)
+
+    def record_failure(self, key: str, exc: BaseException) -> None:
+        host = self._hosts.setdefault(
+            key, {"state": "closed", "failures": 0, "open_s": 0.0, "open_until": 0.0, "probe_started": 0.0}
+        )
+        host["failures"] += 1
+        host["last_error"] = str(exc) or type(exc).__name__
+        if host["state"] == "half_open":
+            open_s = min(host["open_s"] * 2, self.max_open_s)
+        elif host["failures"] >= self.failure_threshold:
+            open_s = self.open_s
+        else:
+            return
+        host["state"] = "open"
+        host["open_s"] = open_s
+        # Jitter keeps a site's powered-down screens from being probed in lockstep.
+        host["open_until"] = time.monotonic() + open_s * random.uniform(0.9, 1.1)
+
+    def snapshot(self) -> dict[str, dict]:
+        now = time.monotonic()
+        return {
+            key: {
+                "state": host["state"],
+                "consecutive_failures": host["failures"],
+                "open_s": round(host["open_s"], 1),
+                "next_probe_in_s": round(max(0.0, host["open_until"] - now), 1),
+                "last_error": host.get("last_error"),
+            }
+            for key, host in list(self._hosts.items())
+        }
+
+
+CIRCUIT_BREAKER = CircuitBreaker()
+
+
+def device_health() -> dict:
+    """Circuit state and latency estimates for every display this process has talked to."""
+    breakers = CIRCUIT_BREAKER.snapshot()
+    latency = HOST_LATENCY.snapshot()
+    hosts = []
+    for key in sorted(set(breakers) | set(latency)):
+        hosts.append(
+            {
+                "host": key,
+                "circuit": breakers.get(key, {"state": "closed", "consecutive_failures": 0}),
+                "latency": latency.get(key, {}),
+            }
+        )
+    return {"hosts": hosts}
+
+
+def _is_broken_session_error(exc: BaseException) -> bool:
+    if isinstance(exc, (ConnectionError, asyncio.IncompleteReadError)):
+        return True
+    # A peer that closed an idle socket shows up as an empty read on the next command.
+    return isinstance(exc, MDCResponseError) and bool(exc.args) and exc.args[0] == "Empty response"
+
+
+def resolve_priority(payload: dict, default: str = "interactive") -> int:
+    name = str(payload.get("priority") or default).strip().lower()
+    if name not in PRIORITY_LANES:
+        raise ValueError(f"priority must be one of: {', '.join(PRIORITY_LANES)}")
+    return PRIORITY_LANES[name]
+
+
+class PriorityGate:
+    """Admits ``slots`` holders at a time: lowest priority first, FIFO within a priority.
+
+    At most ``max_waiting`` callers may queue; further callers get a RuntimeError
+    instead of piling up behind an unresponsive display.
+    """
+
+    def __init__(self, slots: int, max_waiting: int):
+        self.slots = max(1, slots)
+        self.max_waiting = max(0, max_waiting)
+        self._active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def acquire(self, priority: int, name: str = "device") -> None:
+        if self._active < self.slots and not self._waiters:
+            self._active += 1
+            return
+        if len(self._waiters) >= self.max_waiting:
+            raise RuntimeError(f"MDC queue for {name} is full ({len(self._waiters)} waiting)")
+
+        entry = (priority, next(self._order), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, entry)
+        try:
+            await entry[2]
+        except asyncio.CancelledError:
+            if entry[2].done() and not entry[2].cancelled():
+                # The slot was handed over just as this caller gave up; pass it on.
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self) -> None:
+        self._active -= 1
+        while self._waiters and self._active < self.slots:
+            _priority, _order, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+
+
+class MDCConnectionPool:
+    """Reusable MDC sessions keyed by ``ip:port``.
+
+    Each host has a :class:`PriorityGate`, so commands for one display run in priority
+    order up to ``max_sessions_per_host`` at a time while other displays run in parallel.
+    Sessions belong to the event loop that opened them, so the pool rebinds (and forgets
+    old sessions) when it is used from a different loop.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = POOL_IDLE_TIMEOUT_SECONDS,
+        max_sessions_per_host: int = POOL_MAX_SESSIONS_PER_HOST,
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_sessions_per_host = max(1, max_sessions_per_host)
+        self._loop = None
+        self._idle: dict[str, list[tuple[MDC, float]]] = {}
+        self._gates: dict[str, PriorityGate] = {}
+        self._reaper = None
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = {}
+            self._gates = {}
+            self._reaper = None
+        if self._reaper is None and self.idle_timeout > 0:
+            self._reaper = loop.create_task(self._reap_idle())
+        return loop
+
+    @staticmethod
+    def _is_healthy(mdc: MDC) -> bool:
+        reader, writer = mdc.reader, mdc.writer
+        if reader is None or writer is None:
+            return False
+        if writer.is_closing() or reader.at_eof():
+            return False
+        # Buffered bytes are a late reply to an abandoned command; the stream is out of sync.
+        return not getattr(reader, "_buffer", b"")
+
+    @staticmethod
+    def _discard(mdc: MDC) -> None:
+        writer = mdc.writer
+        mdc.reader, mdc.writer = None, None
+        if writer is not None:
+            writer.close()
+
+    async def _open(self, key: str, connect_timeout: float | None = None, action: str = "other") -> MDC:
+        mdc = MDC(key)
+        if connect_timeout is not None:
+            mdc.connect_timeout = connect_timeout
+        started = time.perf_counter()
+        try:
+            await mdc.open()
+        except OSError as exc:
+            # Refused, unreachable and connect timeouts (MDCTimeoutError is an OSError).
+            if isinstance(exc, MDCTimeoutError):
+                HOST_LATENCY.record_timeout(key, "connect", mdc.connect_timeout)
+            CIRCUIT_BREAKER.record_failure(key, exc)
+            raise
+        elapsed = time.perf_counter() - started
+        HOST_LATENCY.record(key, "connect", elapsed)
+        _record_phase(action, "connect", elapsed)
+        CIRCUIT_BREAKER.record_success(key)
+        return mdc
+
+    async def _checkout(
+        self, key: str, connect_timeout: float | None = None, action: str = "other"
+    ) -> tuple[MDC, bool]:
+        now = self._loop.time()
+        idle = self._idle.get(key, [])
+        while idle:
+            mdc, released_at = idle.pop()
+            if now - released_at < self.idle_timeout and self._is_healthy(mdc):
+                return mdc, True
+            self._discard(mdc)
+        # Only new connections consult the breaker; commands queued behind an opening
+        # circuit fail here without touching the network.
+        CIRCUIT_BREAKER.before_request(key)
+        return await self._open(key, connect_timeout, action), False
+
+    def _checkin(self, key: str, mdc: MDC) -> None:
+        if self.idle_timeout <= 0 or not self._is_healthy(mdc):
+            self._discard(mdc)
+            return
+        self._idle.setdefault(key, []).append((mdc, self._loop.time()))
+
+    def _release(self, key: str, mdc: MDC, exc: BaseException | None) -> None:
+        # Validation errors and NAKs leave the protocol in sync; anything else may not.
+        if exc is None or isinstance(exc, (ValueError, NAKError)):
+            self._checkin(key, mdc)
+        else:
+            self._discard(mdc)
+
+    async def run(
+        self,
+        ip: str,
+        port: int,
+        operation,
+        priority: int = PRIORITY_LANES["interactive"],
+        connect_timeout: float | None = None,
+        action: str = "other",
+    ):
+        """Run ``operation(mdc)`` on a pooled session for ``ip:port``.
+
+        A reused session that turns out to be broken is replaced and the operation retried
+        once on a fresh connection. ``action`` only labels the queue and connect metrics.
+        """
+        self._bind_loop()
+        key = f"{ip}:{port}"
+        gate = self._gates.get(key)
+        if gate is None:
+            gate = self._gates[key] = PriorityGate(self.max_sessions_per_host, DEVICE_QUEUE_DEPTH)
+        queued_at = time.perf_counter()
+        await gate.acquire(priority, key)
+        _record_phase(action, "queue", time.perf_counter() - queued_at)
+        try:
+            mdc, reused = await self._checkout(key, connect_timeout, action)
+            try:
+                result = await operation(mdc)
+            except BaseException as exc:
+                self._release(key, mdc, exc)
+                if not (reused and _is_broken_session_error(exc)):
+                    raise
+                mdc = await self._open(key, connect_timeout, action)
+                try:
+                    result = await operation(mdc)
+                except BaseException as retry_exc:
+                    self._release(key, mdc, retry_exc)
+                    raise
+            self._release(key, mdc, None)
+            return result
+        finally:
+            gate.release()
+
+    def stats(self) -> dict[str, int]:
+        """Session and queue totals; safe to call from another thread (values may lag)."""
+        gates = list(self._gates.values())
+        return {
+            "active": sum(gate.active for gate in gates),
+            "waiting": sum(gate.waiting for gate in gates),
+            "idle": sum(len(idle) for idle in list(self._idle.values())),
+        }
+
+    async def _reap_idle(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 2, 1.0))
+            now = self._loop.time()
+            for key, idle in list(self._idle.items()):
+                keep = []
+                for mdc, released_at in idle:
+                    if now - released_at < self.idle_timeout and self._is_healthy(mdc):
+                        keep.append((mdc, released_at))
+                    else:
+                        self._discard(mdc)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    self._idle.pop(key, None)
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        idle, self._idle = self._idle, {}
+        for sessions in idle.values():
+            for mdc, _released_at in sessions:
+                self._discard(mdc)
+
+
+CONNECTION_POOL = MDCConnectionPool()
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers asking for the same key.
+
+    The shared call runs as its own task and callers await it through ``asyncio.shield``,
+    so one caller timing out or being cancelled does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.shared_calls = 0
+
+    async def run(self, key: tuple, factory):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._inflight = {}
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = loop.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self.shared_calls += 1
+        result = await asyncio.shield(task)
+        # Every caller gets its own copy; results are plain JSON-like data.
+        return copy.deepcopy(result)
+
+    def _forget(self, key: tuple, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved when every waiter has already gone away.
+            task.exception()
+
+
+SINGLE_FLIGHT = SingleFlight()
+
+# Action label values; anything else is reported as "other" so callers cannot grow the series.
+METRIC_ACTIONS = {
+    "status",
+    "power",
+    "set_volume",
+    "set_brightness",
+    "set_mute",
+    "set_input",
+    "cli_get",
+    "cli_set",
+    "snapshot",
+}
+
+METRICS.histogram("mdc_action_duration_seconds", "Bridge action latency, cache hits excluded.", ("action",))
+METRICS.histogram(
+    "mdc_phase_duration_seconds",
+    "Time per device phase: queue (waiting for the display), connect, command, decode.",
+    ("action", "phase"),
+)
+METRICS.counter("mdc_action_errors_total", "Failed bridge actions by reason.", ("action", "reason"))
+METRICS.counter("mdc_cache_hits_total", "Reads answered from the device state cache.", ("action",))
+METRICS.gauge("mdc_actions_in_flight", "Bridge actions currently running.", ("action",))
+METRICS.gauge("mdc_device_queue_waiting", "Commands waiting for a display session.")
+METRICS.gauge("mdc_device_sessions_active", "Display sessions currently running a command.")
+METRICS.gauge("mdc_pool_idle_sessions", "Open display sessions parked in the pool.")
+METRICS.gauge("mdc_circuit_hosts", "Displays whose circuit is not closed.", ("state",))
+METRICS.counter("mdc_coalesced_calls_total", "Reads that joined an identical in-flight read.")
+
+
+def _metric_action(action: str) -> str:
+    return action if action in METRIC_ACTIONS else "other"
+
+
+def _error_reason(exc: BaseException) -> str:
+    if isinstance(exc, HostUnreachableError):
+        return "unreachable"
+    if isinstance(exc, ValueError):
+        return "invalid"
+    if isinstance(exc, NAKError):
+        return "nak"
+    if isinstance(exc, MDCResponseError):
+        return "bad_response"
+    if isinstance(exc, OSError):
+        return "connection"
+    return "error"
+
+
+def _collect_bridge_metrics(registry) -> None:
+    pool = CONNECTION_POOL.stats()
+    registry.set("mdc_device_queue_waiting", (), pool["waiting"])
+    registry.set("mdc_device_sessions_active", (), pool["active"])
+    registry.set("mdc_pool_idle_sessions", (), pool["idle"])
+    states: dict[tuple, float] = {}
+    for host in CIRCUIT_BREAKER.snapshot().values():
+        if host["state"] != "closed":
+            states[(host["state"],)] = states.get((host["state"],), 0) + 1
+    registry.replace("mdc_circuit_hosts", states)
+    registry.set("mdc_coalesced_calls_total", (), SINGLE_FLIGHT.shared_calls)
+
+
+METRICS.add_collector(_collect_bridge_metrics)
+
+
+def _validate_cli_get(command_name: str, args_tuple: tuple) -> None:
+    if not command_name:
+        raise ValueError("MDC CLI GET requires command")
+    command = MDC._commands.get(command_name)
+    if command and not getattr(command, "GET", False):
+        raise ValueError(f"{command_name}: this command does not support GET")
+    if getattr(MDC, command_name, None) is None:
+        raise ValueError(f"Unknown MDC command: {command_name}")
+    if command_name in TIMER_INDEXED_COMMANDS:
+        if not args_tuple:
+            raise ValueError(f"{command_name} GET requires timer_id (1-7)")
+        timer_id = int(args_tuple[0])
+        if timer_id < 1 or timer_id > 7:
+            raise ValueError(
+                f"{command_name} GET: timer_id must be between 1 and 7"
+            )
+
+
+async def _read_cli_command(mdc: MDC, command_name: str, args_tuple: tuple, display_id: int) -> dict:
+    method = getattr(mdc, command_name)
+    if command_name in TIMER_INDEXED_COMMANDS:
+        timer_id = int(args_tuple[0])
+        result = await method(display_id, timer_id, ())
+        return {"command": command_name, "args": [timer_id], "result": str(result)}
+
+    result = await method(display_id)
+    return {"command": command_name, "result": str(result)}
+
+
+def parse_snapshot_commands(payload: dict) -> list[tuple[str, str, tuple]]:
+    """Validate ``commands`` (names, or ``{"command", "args"}`` objects for timers).
+
+    Returns ``(result key, command name, args)`` per command; the whole snapshot is
+    rejected before any I/O when one command is unknown or cannot be read.
+    """
+    commands = payload.get("commands")
+    if not isinstance(commands, list) or not commands:
+        raise ValueError("snapshot requires a non-empty commands array")
+
+    parsed = []
+    for entry in commands:
+        if isinstance(entry, dict):
+            command_name = str(entry.get("command", "")).strip()
+            args_tuple = _parse_cli_args(entry)
+        else:
+            command_name = str(entry).strip()
+            args_tuple = tuple()
+        if command_name not in MDC._commands:
+            raise ValueError(f"Unknown MDC command: {command_name}")
+        _validate_cli_get(command_name, args_tuple)
+        result_key = command_name
+        if command_name in TIMER_INDEXED_COMMANDS:
+            result_key = f"{command_name}:{int(args_tuple[0])}"
+        parsed.append((result_key, command_name, args_tuple))
+    return parsed
+
+
+async def _run_snapshot(mdc: MDC, commands: list[tuple[str, str, tuple]], display_id: int) -> dict:
+    """Read every command over one session; a failing command does not stop the others.
+
+    A timeout or broken connection leaves the session unusable, so the remaining commands
+    are reported as skipped and the session is dropped instead of returned to the pool.
+    """
+    results: dict[str, dict] = {}
+    lost_session = None
+    started = time.perf_counter()
+    for result_key, command_name, args_tuple in commands:
+        if lost_session is not None:
+            results[result_key] = {"ok": False, "error": f"skipped: session lost at {lost_session}"}
+            continue
+        command_started = time.perf_counter()
+        try:
+            data = await _read_cli_command(mdc, command_name, args_tuple, display_id)
+        except Exception as exc:
+            elapsed = time.perf_counter() - command_started
+            results[result_key] = {"ok": False, "error": str(exc), "elapsed_ms": round(elapsed * 1000, 1)}
+            if isinstance(exc, MDCTimeoutError):
+                HOST_LATENCY.record_timeout(mdc.target, "response", mdc.timeout)
+            if isinstance(exc, MDCTimeoutError) or _is_broken_session_error(exc):
+                lost_session = result_key
+                MDCConnectionPool._discard(mdc)
+            continue
+        elapsed = time.perf_counter() - command_started
+        HOST_LATENCY.record(mdc.target, "response", elapsed)
+        results[result_key] = {"ok": True, "result": data["result"], "elapsed_ms": round(elapsed * 1000, 1)}
+
+    succeeded = sum(1 for item in results.values() if item["ok"])
+    return {
+        "commands": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _run_signage_action(
+    mdc: MDC,
+    action: str,
+    payload: dict,
+    display_id: int,
+    snapshot_commands: list[tuple[str, str, tuple]] | None = None,
+):
+    if action == "status":
+        raw_status = await mdc.status(display_id)
+        started = time.perf_counter()
+        status = decode_status(raw_status)
+        _record_phase(action, "decode", time.perf_counter() - started)
+        return {"status": status}
+    if action == "power":
+        await mdc.power(display_id, (payload["state"],))
+        return {"sent": "power", "state": payload["state"]}
+    if action == "set_volume":
+        await mdc.volume(display_id, (int(payload["value"]),))
+        return {"sent": "volume", "value": int(payload["value"])}
+    if action == "set_brightness":
+        await mdc.brightness(display_id, (int(payload["value"]),))
+        return {"sent": "brightness", "value": int(payload["value"])}
+    if action == "set_mute":
+        await mdc.mute(display_id, (payload["state"],))
+        return {"sent": "mute", "state": payload["state"]}
+    if action == "set_input":
+        await mdc.input_source(display_id, (payload["source"],))
+        return {"sent": "input_source", "source": payload["source"]}
+    if action == "cli_get":
+        command_name = str(payload.get("command", "")).strip()
+        args_tuple = _parse_cli_args(payload)
+        _validate_cli_get(command_name, args_tuple)
+        return await _read_cli_command(mdc, command_name, args_tuple, display_id)
+
+    if action == "snapshot":
+        if snapshot_commands is None:
+            snapshot_commands = parse_snapshot_commands(payload)
+        return await _run_snapshot(mdc, snapshot_commands, display_id)
+
+    if action == "cli_set":
+        command_name = str(payload.get("command", "")).strip()
+        if not command_name:
+            raise ValueError("MDC CLI SET requires command")
+        command = MDC._commands.get(command_name)
+        if command and not getattr(command, "SET", False):
+            raise ValueError(f"{command_name}: this command does not support SET")
+        method = getattr(mdc, command_name, None)
+        if method is None:
+            raise ValueError(f"Unknown MDC command: {command_name}")
+
+        args_tuple = _parse_cli_args(payload)
+        if command_name in TIMER_INDEXED_COMMANDS:
+            if not args_tuple:
+                raise ValueError(
+                    f"{command_name} SET requires timer_id (1-7) plus values"
+                )
+            timer_id = int(args_tuple[0])
+            timer_data = tuple(args_tuple[1:])
+            if timer_id < 1 or timer_id > 7:
+                raise ValueError(
+                    f"{command_name} SET: timer_id must be between 1 and 7"
+                )
+            if not timer_data:
+                raise ValueError(
+                    f"{command_name} SET requires timer values after timer_id"
+                )
+            result = await method(display_id, timer_id, timer_data)
+            return {
+                "command": command_name,
+                "timer_id": timer_id,
+                "args": list(timer_data),
+                "result": str(result),
+            }
+
+        result = await method(display_id, args_tuple)
+        return {"command": command_name, "args": list(args_tuple), "result": str(result)}
+
+    raise ValueError(f"Unsupported signage action: {action}")
+
+
+def _parse_ttl_overrides(spec: str) -> dict[str, float]:
+    overrides: dict[str, float] = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            overrides[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return overrides
+
+
+def _write_through_value(value, mapping):
+    """Return the value a later status read would decode to, or None when unsure."""
+    if mapping is None:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, int) or str(value).strip().isdigit():
+        decoded = label(value, mapping)
+    else:
+        decoded = str(value).strip().upper()
+    return decoded if decoded in mapping.values() else None
+
+
+class DeviceStateCache:
+    """Recent ``status`` / ``cli_get`` results per ``ip:port:display_id``.
+
+    Reads are stored with their time and served while younger than the command's TTL
+    (or the caller's ``max_age``). Setters update the matching status field when the new
+    value is known and invalidate what they cannot update. Every write also bumps the
+    device generation, so a read that started before it never stores its older value.
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = CACHE_TTL_SECONDS,
+        overrides: dict[str, float] | None = None,
+        max_devices: int = CACHE_MAX_DEVICES,
+    ):
+        self.ttl_s = ttl_s
+        self.overrides = dict(overrides or {})
+        self.max_devices = max(1, max_devices)
+        # device key -> {"generation": int, "entries": {entry key: (data, stored_at)}}
+        self._devices: OrderedDict[tuple, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def entry_key(action: str, payload: dict) -> tuple:
+        if action == "cli_get":
+            return ("cli", str(payload.get("command", "")).strip(), _parse_cli_args(payload))
+        return (action,)
+
+    def ttl_for(self, entry_key: tuple) -> float:
+        name = entry_key[1] if entry_key[0] == "cli" else entry_key[0]
+        return self.overrides.get(name, self.ttl_s)
+
+    def _device(self, device_key: tuple) -> dict:
+        device = self._devices.get(device_key)
+        if device is None:
+            device = {"generation": 0, "entries": {}}
+            self._devices[device_key] = device
+            while len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+        else:
+            self._devices.move_to_end(device_key)
+        return device
+
+    def generation(self, device_key: tuple) -> int:
+        device = self._devices.get(device_key)
+        return device["generation"] if device else 0
+
+    def get(self, device_key: tuple, entry_key: tuple, max_age: float | None):
+        """Return ``(data, age_s)`` for a fresh enough entry, else None."""
+        limit = self.ttl_for(entry_key) if max_age is None else max_age
+        device = self._devices.get(device_key)
+        entry = device["entries"].get(entry_key) if device else None
+        if entry is None or limit <= 0:
+            self.misses += 1
+            return None
+        data, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age > limit:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._devices.move_to_end(device_key)
+        return copy.deepcopy(data), age
+
+    def store(self, device_key: tuple, entry_key: tuple, data, generation: int) -> None:
+        if self.ttl_for(entry_key) <= 0:
+            return
+        device = self._device(device_key)
+        if device["generation"] != generation:
+            return
+        device["entries"][entry_key] = (copy.deepcopy(data), time.monotonic())
+
+    def apply_write(self, device_key: tuple, action: str, payload: dict, succeeded: bool) -> None:
+        device = self._device(device_key)
+        device["generation"] += 1
+        entries = device["entries"]
+
+        if action == "power" and str(payload.get("state", "")).strip().upper() == "REBOOT":
+            entries.clear()
+            return
+
+        if action == "cli_set":
+            command_name = str(payload.get("command", "")).strip()
+            stale = [key for key in entries if key[0] == "cli" and key[1] == command_name]
+            if command_name in STATUS_FIELD_COMMANDS:
+                stale.append(("status",))
+            for key in stale:
+                entries.pop(key, None)
+            return
+
+        field, command_name, payload_key, mapping = WRITE_THROUGH_FIELDS.get(
+            action, (None, None, None, None)
+        )
+        for key in [key for key in entries if key[0] == "cli" and key[1] == command_name]:
+            entries.pop(key, None)
+        if field is None:
+            return
+        status_entry = entries.get(("status",))
+        if status_entry is None:
+            return
+        new_value = _write_through_value(payload.get(payload_key), mapping) if succeeded else None
+        if new_value is None:
+            entries.pop(("status",), None)
+            return
+        status_entry[0]["status"][field] = new_value
+
+
+DEVICE_CACHE = DeviceStateCache(overrides=_parse_ttl_overrides(CACHE_TTL_OVERRIDES))
+
+
+def _cache_max_age(payload: dict) -> float | None:
+    max_age = payload.get("max_age")
+    if max_age is None:
+        return None
+    try:
+        return max(0.0, float(max_age))
+    except (TypeError, ValueError):
+        raise ValueError("max_age must be a number of seconds")
+
+
+def _coalesce_key(action: str, ip: str, port: int, display_id: int, payload: dict) -> tuple:
+    if action == "cli_get":
+        command_name = str(payload.get("command", "")).strip()
+        return (action, ip, port, display_id, command_name, _parse_cli_args(payload))
+    return (action, ip, port, display_id)
+
+
 async def do_signage_action(action: str, payload: dict):
     ip = payload["ip"]
     port = int(payload.get("port", 1515))
     display_id = int(payload.get("display_id", 0))
 
-    async with MDC(f"{ip}:{port}") as mdc:
-        if action == "status":
-            return {"status": decode_status(await mdc.status(display_id))}
-        if action == "power":
-            await mdc.power(display_id, (payload["state"],))
-            return {"sent": "power", "state": payload["state"]}
-        if action == "set_volume":
-            await mdc.volume(display_id, (int(payload["value"]),))
-            return {"sent": "volume", "value": int(payload["value"])}
-        if action == "set_brightness":
-            await mdc.brightness(display_id, (int(payload["value"]),))
-            return {"sent": "brightness", "value": int(payload["value"])}
-        if action == "set_mute":
-            await mdc.mute(display_id, (payload["state"],))
-            return {"sent": "mute", "state": payload["state"]}
-        if action == "set_input":
-            await mdc.input_source(display_id, (payload["source"],))
-            return {"sent": "input_source", "source": payload["source"]}
-        if action == "cli_get":
-            command_name = str(payload.get("command", "")).strip()
-            if not command_name:
-                raise ValueError("MDC CLI GET requires command")
-            command = MDC._commands.get(command_name)
-            if command and not getattr(command, "GET", False):
-                raise ValueError(f"{command_name}: this command does not support GET")
-            method = getattr(mdc, command_name, None)
-            if method is None:
-                raise ValueError(f"Unknown MDC command: {command_name}")
-
-            args_tuple = _parse_cli_args(payload)
-            if command_name in TIMER_INDEXED_COMMANDS:
-                if not args_tuple:
-                    raise ValueError(f"{command_name} GET requires timer_id (1-7)")
-                timer_id = int(args_tuple[0])
-                if timer_id < 1 or timer_id > 7:
-                    raise ValueError(
-                        f"{command_name} GET: timer_id must be between 1 and 7"
-                    )
-                result = await method(display_id, timer_id, ())
-                return {"command": command_name, "args": [timer_id], "result": str(result)}
-
-            result = await method(display_id)
-            return {"command": command_name, "result": str(result)}
+    host_key = f"{ip}:{port}"
+    connect_s, response_s = resolve_device_timeouts(action, payload, host_key)
+    snapshot_commands = None
+    if action == "snapshot":
+        # Reject unknown commands before opening a session.
+        snapshot_commands = parse_snapshot_commands(payload)
 
-        if action == "cli_set":
-            command_name = str(payload.get("command", "")).strip()
-            if not command_name:
-                raise ValueError("MDC CLI SET requires command")
-            command = MDC._commands.get(command_name)
-            if command and not getattr(command, "SET", False):
-                raise ValueError(f"{command_name}: this command does not support SET")
-            method = getattr(mdc, command_name, None)
-            if method is None:
-                raise ValueError(f"Unknown MDC command: {command_name}")
-
-            args_tuple = _parse_cli_args(payload)
-            if command_name in TIMER_INDEXED_COMMANDS:
-                if not args_tuple:
-                    raise ValueError(
-                        f"{command_name} SET requires timer_id (1-7) plus values"
-                    )
-                timer_id = int(args_tuple[0])
-                timer_data = tuple(args_tuple[1:])
-                if timer_id < 1 or timer_id > 7:
-                    raise ValueError(
-                        f"{command_name} SET: timer_id must be between 1 and 7"
-                    )
-                if not timer_data:
-                    raise ValueError(
-                        f"{command_name} SET requires timer values after timer_id"
-                    )
-                result = await method(display_id, timer_id, timer_data)
-                return {
-                    "command": command_name,
-                    "timer_id": timer_id,
-                    "args": list(timer_data),
-                    "result": str(result),
-                }
-
-            result = await method(display_id, args_tuple)
-            return {"command": command_name, "args": list(args_tuple), "result": str(result)}
+    metric_action = _metric_action(action)
 
-    raise ValueError(f"Unsupported signage action: {action}")
+    async def operation(mdc: MDC):
+        mdc.timeout = response_s
+        started = time.perf_counter()
+        try:
+            data = await _run_signage_action(mdc, action, payload, display_id, snapshot_commands)
+        except MDCTimeoutError:
+            if action in COALESCED_ACTIONS:
+                HOST_LATENCY.record_timeout(host_key, "response", response_s)
+            raise
+        elapsed = time.perf_counter() - started
+        _record_phase(metric_action, "command", elapsed)
+        # Snapshots record each of their commands separately.
+        if action in COALESCED_ACTIONS:
+            HOST_LATENCY.record(host_key, "response", elapsed)
+        return data
+
+    priority = resolve_priority(payload)
+
+    async def run_on_device():
+        return await CONNECTION_POOL.run(ip, port, operation, priority, connect_s, metric_action)
+
+    device_key = (ip, port, display_id)
+    if action in COALESCED_ACTIONS:
+        generation = DEVICE_CACHE.generation(device_key)
+        entry_key = DEVICE_CACHE.entry_key(action, payload)
+
+        async def read_and_store():
+            data = await run_on_device()
+            DEVICE_CACHE.store(device_key, entry_key, data, generation)
+            return data
+
+        # Reads started after a write never join one that started before it, and
+        # interactive reads do not wait behind a queued background read.
+        key = _coalesce_key(action, ip, port, display_id, payload) + (generation, priority)
+        return await SINGLE_FLIGHT.run(key, read_and_store)
+
+    if action in READ_ONLY_ACTIONS:
+        return await run_on_device()
+
+    try:
+        data = await run_on_device()
+    except BaseException:
+        DEVICE_CACHE.apply_write(device_key, action, payload, succeeded=False)
+        raise
+    DEVICE_CACHE.apply_write(device_key, action, payload, succeeded=True)
+    return data
+
+
+def _cached_read(action: str, payload: dict):
+    """Return ``(data, age_s)`` when a cached read satisfies the request, else None."""
+    if action not in COALESCED_ACTIONS:
+        return None
+    device_key = (payload["ip"], int(payload.get("port", 1515)), int(payload.get("display_id", 0)))
+    return DEVICE_CACHE.get(device_key, DEVICE_CACHE.entry_key(action, payload), _cache_max_age(payload))
 
 
 async def main_async(action: str, payload: dict):
     if action == "cli_catalog":
         return {"ok": True, "data": {"commands": build_cli_catalog()}}
+    if action == "device_health":
+        return {"ok": True, "data": device_health()}
+    if action == "discover":
+        return await run_discovery(payload)
+    if action == "bulk":
+        return await run_bulk_action(payload)
 
+    trace_id = payload.get("trace_id")
+    if not trace_id:
+        return await _run_device_action(action, payload)
+
+    # Traced calls also report where their time went: queue, connect, command, decode.
+    spans: dict[str, float] = {}
+    token = _action_spans.set(spans)
+    started = time.perf_counter()
+    try:
+        result = await _run_device_action(action, payload)
+    finally:
+        _action_spans.reset(token)
+    timing = {name: round(ms, 1) for name, ms in spans.items()}
+    timing["bridge_total"] = round((time.perf_counter() - started) * 1000, 1)
+    return {**result, "trace_id": trace_id, "timing_ms": timing}
+
+
+async def _run_device_action(action: str, payload: dict):
     protocol = resolve_protocol(payload.get("protocol", "AUTO"), int(payload.get("port", 1515)))
+    metric_action = _metric_action(action)
+    cached = _cached_read(action, payload)
+    if cached is not None:
+        data, age = cached
+        METRICS.inc("mdc_cache_hits_total", (metric_action,))
+        return {"ok": True, "protocol": protocol, "data": data, "cached": True, "cache_age_s": round(age, 3)}
+
     timeout_seconds = resolve_action_timeout(action, payload)
+    METRICS.inc("mdc_actions_in_flight", (metric_action,))
+    started = time.perf_counter()
     try:
         data = await asyncio.wait_for(
             do_signage_action(action, payload),
             timeout=timeout_seconds,
         )
+    except MDCTimeoutError as exc:
+        # A connect/response limit from the host's latency history, not the action budget.
+        METRICS.inc("mdc_action_errors_total", (metric_action, "device_timeout"))
+        raise RuntimeError(f"MDC device timeout: {exc}") from exc
     except asyncio.TimeoutError as exc:
+        METRICS.inc("mdc_action_errors_total", (metric_action, "timeout"))
         raise RuntimeError(
             f"MDC action timeout after {timeout_seconds:.1f}s"
         ) from exc
+    except Exception as exc:
+        METRICS.inc("mdc_action_errors_total", (metric_action, _error_reason(exc)))
+        raise
+    finally:
+        METRICS.inc("mdc_actions_in_flight", (metric_action,), -1)
+        METRICS.observe("mdc_action_duration_seconds", (metric_action,), time.perf_counter() - started)
     return {"ok": True, "protocol": protocol, "data": data}
 
 
+def parse_bulk_request(payload: dict) -> tuple[str, list[dict], int]:
+    """Validate a bulk request and return ``(action, per-target payloads, concurrency)``.
+
+    Each target payload is the shared ``payload`` merged with the target's own fields.
+    """
+    action = str(payload.get("action", "")).strip()
+    if not action:
+        raise ValueError("bulk requires action")
+    if action in NON_BULK_ACTIONS:
+        raise ValueError(f"{action} cannot be run in bulk")
+
+    common = payload.get("payload") or {}
+    if not isinstance(common, dict):
+        raise ValueError("bulk payload must be an object")
+
+    targets = payload.get("targets")
+    if not isinstance(targets, list) or not targets:
+        raise ValueError("bulk requires a non-empty targets array")
+
+    target_payloads = []
+    for index, target in enumerate(targets):
+        if not isinstance(target, dict):
+            raise ValueError(f"bulk target {index} must be an object")
+        merged = {**common, **target}
+        # Bulk sweeps yield to operator commands unless the request says otherwise.
+        merged.setdefault("priority", "background")
+        resolve_priority(merged)
+        ip = str(merged.get("ip") or merged.get("tv_ip") or "").strip()
+        if not ip:
+            raise ValueError(f"bulk target {index} requires ip")
+        merged["ip"] = ip
+        target_payloads.append(merged)
+
+    concurrency = BULK_MAX_CONCURRENCY
+    if payload.get("concurrency") is not None:
+        concurrency = min(max(int(payload["concurrency"]), 1), BULK_MAX_CONCURRENCY)
+
+    return action, target_payloads, concurrency
+
+
+async def iter_bulk_actions(action: str, target_payloads: list[dict], concurrency: int):
+    """Run ``action`` for every target payload and yield each result as soon as it finishes.
+
+    Concurrency is bounded overall and per ``ip:port``; a task waiting for its host does
+    not hold one of the global slots.
+    """
+    overall_limit = asyncio.Semaphore(max(1, concurrency))
+    host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def run_target(index: int, target_payload: dict) -> dict:
+        port = int(target_payload.get("port", 1515))
+        display_id = int(target_payload.get("display_id", 0))
+        host_key = f"{target_payload['ip']}:{port}"
+        host_limit = host_limits.setdefault(
+            host_key, asyncio.Semaphore(max(1, BULK_PER_HOST_CONCURRENCY))
+        )
+        async with host_limit:
+            async with overall_limit:
+                try:
+                    result = await main_async(action, target_payload)
+                except Exception as exc:
+                    result = {"ok": False, "error": str(exc)}
+        return {
+            "index": index,
+            "ip": target_payload["ip"],
+            "port": port,
+            "display_id": display_id,
+            **result,
+        }
+
+    tasks = [
+        asyncio.create_task(run_target(index, target_payload))
+        for index, target_payload in enumerate(target_payloads)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_bulk_action(payload: dict):
+    action, target_payloads, concurrency = parse_bulk_request(payload)
+    results = [item async for item in iter_bulk_actions(action, target_payloads, concurrency)]
+    results.sort(key=lambda item: item["index"])
+    succeeded = sum(1 for item in results if item.get("ok"))
+    return {
+        "ok": True,
+        "data": {
+            "action": action,
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+        },
+    }
+
+
+def parse_discovery_request(payload: dict) -> dict:
+    """Validate a discovery request and expand its ``cidr`` ranges and ``ips`` into addresses."""
+    cidrs = payload.get("cidr") or []
+    if isinstance(cidrs, str):
+        cidrs = [cidrs]
+    ips = payload.get("ips") or []
+    if not isinstance(cidrs, list) or not isinstance(ips, list):
+        raise ValueError("discover cidr and ips must be a string or an array")
+    if not cidrs and not ips:
+        raise ValueError("discover requires cidr or ips")
+
+    addresses: dict[str, None] = {}
+    for cidr in cidrs:
+        try:
+            network = ipaddress.ip_network(str(cidr).strip(), strict=False)
+        except ValueError as exc:
+            raise ValueError(f"Invalid cidr: {cidr}") from exc
+        # Checked before expanding so a huge range is never enumerated (hosts() skips 2).
+        if network.num_addresses - 2 > DISCOVERY_MAX_HOSTS:
+            raise ValueError(f"discover is limited to {DISCOVERY_MAX_HOSTS} addresses")
+        for address in network.hosts():
+            addresses[str(address)] = None
+    for ip in ips:
+        text = str(ip).strip()
+        try:
+            addresses[str(ipaddress.ip_address(text))] = None
+        except ValueError as exc:
+            raise ValueError(f"Invalid ip: {text}") from exc
+    if len(addresses) > DISCOVERY_MAX_HOSTS:
+        raise ValueError(f"discover is limited to {DISCOVERY_MAX_HOSTS} addresses")
+
+    concurrency = DISCOVERY_CONCURRENCY
+    if payload.get("concurrency") is not None:
+        concurrency = min(max(int(payload["concurrency"]), 1), DISCOVERY_CONCURRENCY)
+
+    return {
+        "ips": list(addresses),
+        "port": int(payload.get("port", 1515)),
+        "display_id": int(payload.get("display_id", 0)),
+        "concurrency": concurrency,
+        "probe_timeout_s": float(payload.get("probe_timeout_s") or DISCOVERY_PROBE_TIMEOUT_SECONDS),
+        "identify": bool(payload.get("identify", True)),
+    }
+
+
+def _single_value(value):
+    if isinstance(value, tuple) and len(value) == 1:
+        value = value[0]
+    return getattr(value, "name", None) or str(value)
+
+
+async def identify_display(ip: str, port: int, display_id: int) -> dict:
+    """Read the model name and serial number of the display at ``ip:port``.
+
+    Uses a one-off session with the fixed limits: a scan touches thousands of addresses,
+    which must not linger in the connection pool, latency tracker or circuit breaker.
+    """
+    mdc = MDC(f"{ip}:{port}")
+    mdc.connect_timeout = CONNECT_TIMEOUT_SECONDS
+    mdc.timeout = RESPONSE_TIMEOUT_SECONDS
+    try:
+        await mdc.open()
+        info = {}
+        for command_name in IDENTIFY_COMMANDS:
+            info[command_name] = _single_value(await getattr(mdc, command_name)(display_id))
+        return info
+    finally:
+        MDCConnectionPool._discard(mdc)
+
+
+async def iter_discovery(request: dict):
+    """Probe every address in a parsed discovery request; yield each open port as it is found.
+
+    Closed addresses are not yielded. With ``identify`` set, each hit is confirmed with an
+    MDC model/serial read before it is reported.
+    """
+    limit = asyncio.Semaphore(request["concurrency"])
+    port = request["port"]
+
+    async def scan(ip: str) -> dict | None:
+        async with limit:
+            if not await probe_tcp(ip, port, request["probe_timeout_s"]):
+                return None
+            found = {"ip": ip, "port": port, "open": True}
+            if not request["identify"]:
+                return found
+            try:
+                info = await identify_display(ip, port, request["display_id"])
+            except Exception as exc:
+                return {**found, "mdc": False, "error": str(exc)}
+            return {**found, "mdc": True, **info}
+
+    tasks = [asyncio.create_task(scan(ip)) for ip in request["ips"]]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            found = await next_done
+            if found is not None:
+                yield found
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_discovery(payload: dict):
+    request = parse_discovery_request(payload)
+    found = [item async for item in iter_discovery(request)]
+    found.sort(key=lambda item: ipaddress.ip_address(item["ip"]))
+    return {
+        "ok": True,
+        "data": {
+            "scanned": len(request["ips"]),
+            "found": found,
+            "confirmed": sum(1 for item in found if item.get("mdc")),
+        },
+    }
+
+
+async def _serve_request(line: str, write_line) -> None:
+    request_id = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+        request_id = request.get("id")
+        action = str(request.get("action", "")).strip()
+        payload = request.get("payload") or {}
+        if not action:
+            raise ValueError("Missing action")
+        if not isinstance(payload, dict):
+            raise ValueError("payload must be an object")
+        result = await main_async(action, payload)
+    except Exception as exc:
+        result = {"ok": False, "error": str(exc)}
+    write_line({"id": request_id, **result})
+
+
+async def serve_async(input_stream=None, output_stream=None) -> None:
+    """Long-lived mode: one JSON request per stdin line, one correlated response per stdout line.
+
+    Requests are ``{"id": ..., "action": ..., "payload": {...}}``; responses echo ``id``
+    next to the usual ``ok``/``data``/``error`` keys and may arrive out of order.
+    """
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    loop = asyncio.get_running_loop()
+    pending: set[asyncio.Task] = set()
+
+    def write_line(message: dict) -> None:
+        output_stream.write(json.dumps(message, ensure_ascii=False) + "\n")
+        output_stream.flush()
+
+    write_line({"id": None, "ok": True, "event": "ready"})
+
+    while True:
+        # Blocking readline in a worker thread works for pipes on every platform,
+        # unlike loop.connect_read_pipe on Windows.
+        line = await loop.run_in_executor(None, input_stream.readline)
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        task = asyncio.create_task(_serve_request(line, write_line))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    await CONNECTION_POOL.close()
+
+
+async def run_action_once(action: str, payload: dict):
+    """Run one action and close pooled sessions, for callers that use a loop per action."""
+    try:
+        return await main_async(action, payload)
+    finally:
+        await CONNECTION_POOL.close()
+
+
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "--serve":
+        asyncio.run(serve_async())
+        return
+
     if len(sys.argv) < 3:
-        print(json.dumps({"ok": False, "error": "Usage: bridge.py <action> <json_payload>"}))
+        print(
+            json.dumps(
+                {"ok": False, "error": "Usage: bridge.py <action> <json_payload> | bridge.py --serve"}
+            )
+        )
         raise SystemExit(2)
 
     action = sys.argv[1]
     payload = json.loads(sys.argv[2])
 
     try:
-        result = asyncio.run(main_async(action, payload))
+        result = asyncio.run(run_action_once(action, payload))
     except Exception as exc:
         result = {"ok": False, "error": str(exc)}
 
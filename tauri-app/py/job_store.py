@@ -0,0 +1,157 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+TERMINAL_STATUSES = ("completed", "failed", "dead_letter")
+# Longest pause between retries of a batch that failed to commit.
+RETRY_MAX_SECONDS = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    agent_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_agent_status_created
+    ON jobs (agent_id, status, created_at);
+"""
+
+
+class SqliteJobStore:
+    """Write-behind SQLite (WAL) journal for broker jobs.
+
+    Memory stays the source of truth; ``save`` and ``delete`` only enqueue work and a
+    writer thread applies it in batched transactions, so callers can use them while
+    holding the broker lock. A batch that fails to commit is kept and retried with
+    backoff ahead of newer changes. Changes still queued when the process is killed
+    without ``close`` are lost, so the journal trails memory by up to one flush interval.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.05, max_batch: int = 500):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._pending: queue.Queue = queue.Queue()
+        # Changes of a batch that failed to commit, applied before anything newer.
+        self._retry: list = []
+        self._writer: threading.Thread | None = None
+        self._closed = threading.Event()
+
+    def load_pending(self) -> list[dict]:
+        """Return non-terminal jobs in creation order and purge terminal rows.
+
+        Terminal jobs are not replayed after a restart, so their rows are dropped here.
+        """
+        placeholders = ",".join("?" for _ in TERMINAL_STATUSES)
+        rows = self._conn.execute(
+            f"SELECT data FROM jobs WHERE status NOT IN ({placeholders}) ORDER BY created_at",
+            TERMINAL_STATUSES,
+        ).fetchall()
+        self._conn.execute(f"DELETE FROM jobs WHERE status IN ({placeholders})", TERMINAL_STATUSES)
+        self._conn.commit()
+        return [json.loads(row[0]) for row in rows]
+
+    def start(self) -> None:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run_writer, name="job-store", daemon=True)
+            self._writer.start()
+
+    def save(self, job: dict) -> None:
+        self._pending.put(
+            (
+                "save",
+                job["job_id"],
+                (
+                    job["job_id"],
+                    job.get("agent_id", ""),
+                    job.get("status", ""),
+                    job.get("created_at") or "",
+                    json.dumps(job, ensure_ascii=False),
+                ),
+            )
+        )
+
+    def delete(self, job_id: str) -> None:
+        self._pending.put(("delete", job_id, None))
+
+    def close(self) -> None:
+        """Stop the writer and commit everything still queued."""
+        self._closed.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        try:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                self._flush(batch)
+        except sqlite3.Error as exc:
+            print(f"[job-store] {len(batch) + self._pending.qsize()} changes not written on close: {exc}")
+        finally:
+            self._conn.close()
+
+    def _drain(self, first=None) -> list:
+        batch, self._retry = self._retry, []
+        if first is not None:
+            batch.append(first)
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: list) -> None:
+        if not batch:
+            return
+        # Only the last operation per job matters within one transaction.
+        latest: dict[str, tuple] = {}
+        for op, job_id, row in batch:
+            latest.pop(job_id, None)
+            latest[job_id] = (op, row)
+
+        saves = [row for op, row in latest.values() if op == "save"]
+        deletes = [(job_id,) for job_id, (op, _row) in latest.items() if op == "delete"]
+        with self._conn:
+            if saves:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO jobs (job_id, agent_id, status, created_at, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    saves,
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM jobs WHERE job_id = ?", deletes)
+
+    def _run_writer(self) -> None:
+        failures = 0
+        while not self._closed.is_set():
+            try:
+                first = self._pending.get(timeout=0.5)
+            except queue.Empty:
+                if not self._retry:
+                    continue
+                first = None
+            # Linger briefly so bursts of changes share one commit.
+            if self._pending.qsize() < self.max_batch:
+                time.sleep(self.flush_interval)
+            batch = self._drain(first)
+            try:
+                self._flush(batch)
+                failures = 0
+            except sqlite3.Error as exc:
+                failures += 1
+                self._retry = batch
+                delay = min(RETRY_MAX_SECONDS, self.flush_interval * 2**failures)
+                print(f"[job-store] write of {len(batch)} changes failed, retrying in {delay:.1f}s: {exc}")
+                self._closed.wait(delay)
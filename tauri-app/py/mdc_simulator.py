@@ -0,0 +1,293 @@
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import sys
+from pathlib import Path
+
+if not getattr(sys, "frozen", False):
+    ROOT_DIR = Path(__file__).resolve().parents[2]
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+
+from samsung_mdc import MDC, fields
+from samsung_mdc.connection import HEADER_CODE, get_checksum, pack_response
+
+STATUS_CMD = 0x00
+# Order of the values in a status reply, followed by two zero bytes (N/F time).
+STATUS_COMMANDS = ("power", "volume", "mute", "input_source", "picture_aspect")
+# NAK error code for data the display cannot accept.
+NAK_INVALID_DATA = 0x01
+
+
+def _sample_value(field):
+    if isinstance(field, fields.Bitmask):
+        return ()
+    if isinstance(field, fields.Enum):
+        return next(iter(field.enum))
+    if isinstance(field, fields.Bool):
+        return False
+    if isinstance(field, fields.Int):
+        return field.range.start if field.range else 0
+    if isinstance(field, fields.Str):
+        return "SIM"
+    if isinstance(field, fields.StrCoded):
+        return ""
+    if isinstance(field, (fields.Time12H, fields.Time)):
+        return datetime.time(8, 0)
+    if isinstance(field, fields.DateTime):
+        return datetime.datetime(2024, 1, 1, 8, 0)
+    if isinstance(field, fields.IPAddress):
+        return "192.168.0.100"
+    if isinstance(field, fields.VideoWallModel):
+        return "1,1"
+    return None
+
+
+def _pack_fields(field_list) -> bytes:
+    data = b""
+    for field in field_list:
+        value = _sample_value(field)
+        if value is not None:
+            data += bytes(field.pack(value))
+    return data
+
+
+def command_table(timer_layout: str = "timer_15") -> dict[tuple[int, int | None], object]:
+    """``(cmd, subcmd) -> command``; timer commands are registered under each timer code.
+
+    ``timer_13`` and ``timer_15`` share their codes, so a display speaks one of the two
+    layouts, like real panels of different generations.
+    """
+    table = {}
+    for name, command in MDC._commands.items():
+        if isinstance(command.CMD, int):
+            table[(command.CMD, command.SUBCMD)] = command
+        elif name == timer_layout:
+            for code in command._TIMER_ID_CMD:
+                table[(code, None)] = command
+    return table
+
+
+def _replies(table: dict) -> tuple[dict, dict]:
+    """Default GET replies, and the bytes a SET reply carries after the echoed data."""
+    defaults = {key: _pack_fields(command.RESPONSE_DATA) for key, command in table.items()}
+    extras = {key: _pack_fields(command.RESPONSE_DATA[len(command.DATA):]) for key, command in table.items()}
+    return defaults, extras
+
+
+def _key_for(name: str) -> tuple[int, int | None]:
+    command = MDC._commands[name]
+    return (command.CMD, command.SUBCMD)
+
+
+class SimulatedDisplay:
+    """One display on one port; values are kept per display_id, like a daisy chain."""
+
+    def __init__(
+        self,
+        index: int,
+        port: int,
+        options: argparse.Namespace,
+        rng: random.Random,
+        table: dict,
+        replies: tuple[dict, dict],
+    ):
+        self.index = index
+        self.port = port
+        self.options = options
+        self.rng = rng
+        self.table = table
+        self.subcmd_codes = {cmd for cmd, subcmd in table if subcmd is not None}
+        self.defaults, self.extras = replies
+        self.values: dict[tuple[int, tuple], bytes] = {}
+        self.connections = 0
+        self.commands = 0
+        self.dropped = 0
+        self.rejected = 0
+        # A real panel handles one MDC command at a time, whichever connection sent it.
+        self._busy = asyncio.Lock() if options.serialize else None
+        self._server: asyncio.AbstractServer | None = None
+
+    def _initial(self, display_id: int, key: tuple) -> bytes:
+        if key == _key_for("power"):
+            return MDC._commands["power"].pack_payload_data(("ON",))
+        if key == _key_for("volume"):
+            return bytes([10])
+        if key == _key_for("serial_number"):
+            return f"SIM{self.port:05d}{display_id:02d}".encode()
+        if key == _key_for("model_name"):
+            return b"MDC-SIMULATOR"
+        return self.defaults[key]
+
+    def value(self, display_id: int, key: tuple) -> bytes:
+        stored = self.values.get((display_id, key))
+        return stored if stored is not None else self._initial(display_id, key)
+
+    def reply(self, cmd: int, display_id: int, data: bytes) -> bytes:
+        if cmd == STATUS_CMD:
+            body = b"".join(self.value(display_id, _key_for(name)) for name in STATUS_COMMANDS)
+            return pack_response(cmd, display_id, True, body + b"\x00\x00")
+
+        subcmd = None
+        if cmd in self.subcmd_codes and data and (cmd, data[0]) in self.table:
+            subcmd, data = data[0], data[1:]
+        key = (cmd, subcmd)
+        command = self.table.get(key)
+        if command is None:
+            return pack_response(cmd, display_id, False, bytes([NAK_INVALID_DATA]))
+        response_cmd = (cmd, subcmd) if subcmd is not None else cmd
+
+        if data and command.SET:
+            body = data + self.extras[key]
+            try:
+                command.parse_response_data(body)
+            except Exception:
+                return pack_response(response_cmd, display_id, False, bytes([NAK_INVALID_DATA]))
+            self.values[(display_id, key)] = body
+            return pack_response(response_cmd, display_id, True, body)
+        return pack_response(response_cmd, display_id, True, self.value(display_id, key))
+
+    async def _delay(self) -> None:
+        delay_ms = self.options.latency_ms + self.rng.uniform(0, self.options.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    async def _answer(self, writer: asyncio.StreamWriter, cmd: int, display_id: int, data: bytes) -> None:
+        self.commands += 1
+        await self._delay()
+        if self.options.drop_rate and self.rng.random() < self.options.drop_rate:
+            # No reply at all; the client has to time out.
+            self.dropped += 1
+            return
+        writer.write(self.reply(cmd, display_id, data))
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self.options.max_connections and self.connections >= self.options.max_connections:
+            self.rejected += 1
+            writer.close()
+            return
+        self.connections += 1
+        try:
+            while True:
+                header = await reader.readexactly(4)
+                if header[0] != HEADER_CODE:
+                    break
+                cmd, display_id, length = header[1], header[2], header[3]
+                rest = await reader.readexactly(length + 1)
+                data, checksum = rest[:-1], rest[-1]
+                if get_checksum(header[1:] + data) != checksum:
+                    break
+                if self._busy is None:
+                    await self._answer(writer, cmd, display_id, data)
+                else:
+                    async with self._busy:
+                        await self._answer(writer, cmd, display_id, data)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def start(self, host: str) -> None:
+        self._server = await asyncio.start_server(self.handle, host, self.port)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+
+
+class DisplaySimulator:
+    """``options.count`` simulated displays on consecutive ports from ``options.base_port``.
+
+    Every command in ``MDC._commands`` is answered: GETs return the display's current value
+    (a valid default until something is set), SETs store and echo their data like a real
+    panel, and ``status`` is assembled from the power/volume/mute/input/aspect values.
+    """
+
+    def __init__(self, options: argparse.Namespace):
+        self.options = options
+        rng = random.Random(options.seed)
+        table = command_table(options.timer_layout)
+        replies = _replies(table)
+        self.displays = [
+            SimulatedDisplay(
+                index, options.base_port + index, options, random.Random(rng.random()), table, replies
+            )
+            for index in range(options.count)
+        ]
+
+    @property
+    def targets(self) -> list[dict]:
+        return [{"ip": self.options.host, "port": display.port} for display in self.displays]
+
+    async def start(self) -> None:
+        await asyncio.gather(*(display.start(self.options.host) for display in self.displays))
+
+    def close(self) -> None:
+        for display in self.displays:
+            display.close()
+
+    def stats(self) -> dict:
+        return {
+            "displays": len(self.displays),
+            "commands": sum(display.commands for display in self.displays),
+            "dropped": sum(display.dropped for display in self.displays),
+            "rejected_connections": sum(display.rejected for display in self.displays),
+            "open_connections": sum(display.connections for display in self.displays),
+        }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Simulated Samsung MDC displays")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=15200)
+    parser.add_argument("--count", type=int, default=1, help="number of displays (one port each)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fixed delay before each reply")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay, 0..jitter")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of commands never answered")
+    parser.add_argument(
+        "--serialize", action="store_true", help="one command at a time per display, across connections"
+    )
+    parser.add_argument(
+        "--max-connections", type=int, default=0, help="connections accepted per display; 0 = unlimited"
+    )
+    parser.add_argument("--timer-layout", choices=("timer_13", "timer_15"), default="timer_15")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+async def serve(options: argparse.Namespace) -> None:
+    simulator = DisplaySimulator(options)
+    await simulator.start()
+    # One JSON line on stdout tells a parent process the ports are open.
+    print(
+        json.dumps(
+            {
+                "event": "ready",
+                "host": options.host,
+                "base_port": options.base_port,
+                "count": options.count,
+            }
+        ),
+        flush=True,
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        simulator.close()
+        print(json.dumps({"event": "stopped", **simulator.stats()}), flush=True)
+
+
+def main() -> None:
+    options = build_parser().parse_args()
+    try:
+        asyncio.run(serve(options))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
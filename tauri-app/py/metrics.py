@@ -0,0 +1,244 @@
+import bisect
+import math
+import re
+import threading
+import time
+
+# Seconds; covers a LAN round trip up to the longest action timeout.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_NAME_PATTERN = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms rendered in the Prometheus text format.
+
+    Families are declared once; an update is a dict lookup and an add under one lock, so
+    recording stays cheap on hot paths. Series are keyed by a tuple of label values in the
+    order the family declared its label names. Collectors run only when a snapshot is taken,
+    for gauges that are cheaper to read from live state than to keep up to date.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: dict[str, dict] = {}
+        self._collectors: list = []
+
+    def _declare(self, name: str, kind: str, help_text: str, labels: tuple, buckets=None) -> None:
+        with self._lock:
+            if name not in self._families:
+                self._families[name] = {
+                    "type": kind,
+                    "help": help_text,
+                    "labels": tuple(labels),
+                    "buckets": tuple(buckets) if buckets else None,
+                    "series": {},
+                }
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> None:
+        self._declare(name, "counter", help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> None:
+        self._declare(name, "gauge", help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets=LATENCY_BUCKETS) -> None:
+        self._declare(name, "histogram", help_text, labels, buckets)
+
+    def add_collector(self, collector) -> None:
+        self._collectors.append(collector)
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1.0) -> None:
+        """Add ``value`` to a counter or gauge (gauges may go down)."""
+        with self._lock:
+            series = self._families[name]["series"]
+            series[labels] = series.get(labels, 0.0) + value
+
+    def set(self, name: str, labels: tuple, value: float) -> None:
+        with self._lock:
+            self._families[name]["series"][labels] = float(value)
+
+    def replace(self, name: str, values: dict[tuple, float]) -> None:
+        """Swap every series of a gauge at once, so label sets that went away disappear."""
+        with self._lock:
+            self._families[name]["series"] = {labels: float(value) for labels, value in values.items()}
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        with self._lock:
+            family = self._families[name]
+            series = family["series"].get(labels)
+            if series is None:
+                series = family["series"][labels] = [[0] * (len(family["buckets"]) + 1), 0.0, 0]
+            # Bucket ``le`` includes its bound; the extra slot is +Inf.
+            series[0][bisect.bisect_left(family["buckets"], value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return every family as JSON-ready data, after running the collectors."""
+        for collector in self._collectors:
+            try:
+                collector(self)
+            except Exception as exc:
+                # A gauge that cannot be read this time must not break the scrape.
+                print(f"[metrics] collector {getattr(collector, '__name__', collector)} failed: {exc}")
+        with self._lock:
+            families = {}
+            for name, family in self._families.items():
+                if family["type"] == "histogram":
+                    series = [
+                        {"labels": list(labels), "buckets": list(counts), "sum": total, "count": count}
+                        for labels, (counts, total, count) in family["series"].items()
+                    ]
+                else:
+                    series = [{"labels": list(labels), "value": value} for labels, value in family["series"].items()]
+                families[name] = {
+                    "type": family["type"],
+                    "help": family["help"],
+                    "labels": list(family["labels"]),
+                    "buckets": list(family["buckets"]) if family["buckets"] else None,
+                    "series": series,
+                }
+            return families
+
+
+def validate_snapshot(snapshot: dict) -> dict[str, dict]:
+    """Check that a snapshot received from elsewhere can be rendered; raises ValueError."""
+    if not isinstance(snapshot, dict):
+        raise ValueError("metrics snapshot must be an object")
+    for name, family in snapshot.items():
+        if not _NAME_PATTERN.match(str(name)):
+            raise ValueError(f"invalid metric name: {name!r}")
+        if not isinstance(family, dict) or family.get("type") not in {"counter", "gauge", "histogram"}:
+            raise ValueError(f"metric {name}: unknown type")
+        if not isinstance(family.get("help"), str):
+            raise ValueError(f"metric {name}: help must be a string")
+        labels = family.get("labels")
+        series_list = family.get("series")
+        if not isinstance(labels, list) or not isinstance(series_list, list):
+            raise ValueError(f"metric {name}: labels and series must be arrays")
+        if not all(_NAME_PATTERN.match(str(label)) for label in labels):
+            raise ValueError(f"metric {name}: invalid label name")
+        buckets = family.get("buckets") if family["type"] == "histogram" else None
+        if family["type"] == "histogram" and not isinstance(buckets, list):
+            raise ValueError(f"metric {name}: histogram without buckets")
+        if buckets is not None and not all(_is_number(bound) for bound in buckets):
+            raise ValueError(f"metric {name}: bucket bounds must be numbers")
+        for series in series_list:
+            if not isinstance(series, dict) or not isinstance(series.get("labels"), list):
+                raise ValueError(f"metric {name}: series without labels")
+            if len(series["labels"]) != len(labels):
+                raise ValueError(f"metric {name}: series labels do not match the family")
+            if buckets is None:
+                if not _is_number(series.get("value")):
+                    raise ValueError(f"metric {name}: value must be a number")
+                continue
+            counts = series.get("buckets")
+            if not isinstance(counts, list) or len(counts) != len(buckets) + 1:
+                raise ValueError(f"metric {name}: bucket counts do not match the bounds")
+            if not all(_is_number(count) for count in counts + [series.get("sum"), series.get("count")]):
+                raise ValueError(f"metric {name}: bucket counts, sum and count must be numbers")
+    return snapshot
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value) -> str:
+    # HELP text escapes only backslash and newline; a quote stays as it is.
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_number(value) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(pairs: list[tuple[str, object]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def render(sources: list[tuple[dict[str, str], dict[str, dict]]]) -> str:
+    """Render ``(extra labels, snapshot)`` pairs as one Prometheus text exposition.
+
+    Families with the same name from several sources (say, the broker and each agent)
+    are written under one HELP/TYPE header, told apart by their extra labels.
+    """
+    merged: dict[str, tuple[dict, list]] = {}
+    for extra_labels, snapshot in sources:
+        extra = list(extra_labels.items())
+        for name, family in snapshot.items():
+            entry = merged.setdefault(name, (family, []))
+            for series in family["series"]:
+                entry[1].append((extra + list(zip(family["labels"], series["labels"])), family, series))
+
+    lines = []
+    for name in sorted(merged):
+        header, series_list = merged[name]
+        if not series_list:
+            continue
+        lines.append(f"# HELP {name} {_escape_help(header['help'])}")
+        lines.append(f"# TYPE {name} {header['type']}")
+        for pairs, family, series in series_list:
+            if family["type"] != header["type"]:
+                # Another process version declared this name differently; skip its series.
+                continue
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(pairs)} {_format_number(series['value'])}")
+                continue
+            cumulative = 0
+            bounds = list(family["buckets"]) + [math.inf]
+            for bound, count in zip(bounds, series["buckets"]):
+                cumulative += count
+                bucket_labels = _format_labels(pairs + [("le", _format_number(bound))])
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(pairs)} {_format_number(series['sum'])}")
+            lines.append(f"{name}_count{_format_labels(pairs)} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class ContendedLock:
+    """A ``threading.Lock`` that records how long callers wait when it is already held.
+
+    Uncontended acquisitions take the fast path and record nothing. Works as the lock of a
+    ``threading.Condition``.
+    """
+
+    def __init__(self, registry: MetricsRegistry, metric: str):
+        self._lock = threading.Lock()
+        self._registry = registry
+        self._metric = metric
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            return True
+        if not blocking:
+            return False
+        started = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        self._registry.observe(self._metric, (), time.perf_counter() - started)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info) -> None:
+        self._lock.release()
+
+
+# Process-wide registry shared by the bridge, the backend and the agent.
+METRICS = MetricsRegistry()
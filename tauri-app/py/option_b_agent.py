@@ -1,25 +1,171 @@
+import asyncio
+import gzip
+import http.client
 import json
 import os
 import socket
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any
-from urllib.error import HTTPError, URLError
-from urllib.parse import quote, urlencode
-from urllib.request import Request, urlopen
+from urllib.parse import quote, urlencode, urlsplit
+
+from metrics import METRICS, render as render_metrics
 
 CLOUD_BASE_URL = os.getenv("CLOUD_BASE_URL", "").strip().rstrip("/")
 AGENT_ID = os.getenv("AGENT_ID", "").strip()
 AGENT_SHARED_SECRET = os.getenv("AGENT_SHARED_SECRET", "").strip()
 LOCAL_BACKEND_URL = os.getenv("LOCAL_BACKEND_URL", "http://127.0.0.1:8765").strip().rstrip("/")
 AGENT_POLL_INTERVAL_SECONDS = float(os.getenv("AGENT_POLL_INTERVAL_SECONDS", "2"))
+AGENT_POLL_WAIT_SECONDS = float(os.getenv("AGENT_POLL_WAIT_SECONDS", "20"))
 AGENT_MAX_JOBS_PER_POLL = int(os.getenv("AGENT_MAX_JOBS_PER_POLL", "5"))
 AGENT_REQUEST_TIMEOUT_SECONDS = float(os.getenv("AGENT_REQUEST_TIMEOUT_SECONDS", "20"))
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "8"))
+# Parallel displays per group job unless the job sets its own concurrency.
+AGENT_GROUP_CONCURRENCY = int(os.getenv("AGENT_GROUP_CONCURRENCY", "16"))
+# Periodic local status sweep; changed fields are pushed to the broker. 0 disables it.
+AGENT_SWEEP_INTERVAL_SECONDS = float(os.getenv("AGENT_SWEEP_INTERVAL_SECONDS", "60"))
+# Comma separated ip or ip:port, or a JSON file with [{"ip", "port", "display_id"}, ...].
+AGENT_SWEEP_TARGETS = os.getenv("AGENT_SWEEP_TARGETS", "").strip()
+AGENT_SWEEP_TARGETS_FILE = os.getenv("AGENT_SWEEP_TARGETS_FILE", "").strip()
+AGENT_SWEEP_CONCURRENCY = int(os.getenv("AGENT_SWEEP_CONCURRENCY", "16"))
+AGENT_HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("AGENT_HEARTBEAT_INTERVAL_SECONDS", "15"))
+# Results finishing within this window are reported to the broker in one request.
+AGENT_RESULT_BATCH_LINGER_SECONDS = float(os.getenv("AGENT_RESULT_BATCH_LINGER_SECONDS", "0.2"))
+AGENT_RESULT_BATCH_MAX = int(os.getenv("AGENT_RESULT_BATCH_MAX", "100"))
+# Compress broker request bodies of at least this many bytes (results can be large).
+AGENT_GZIP_REQUESTS = os.getenv("AGENT_GZIP_REQUESTS", "false").strip().lower() in {
+    "1",
+    "true",
+    "yes",
+    "on",
+}
+AGENT_GZIP_MIN_BYTES = int(os.getenv("AGENT_GZIP_MIN_BYTES", "1024"))
+# auto: run jobs in-process when bridge.py and samsung_mdc import, else use LOCAL_BACKEND_URL.
+AGENT_EXECUTION_MODE = os.getenv("AGENT_EXECUTION_MODE", "auto").strip().lower()
+# Metrics are pushed to the broker's /metrics; a port also serves them locally. 0 disables.
+AGENT_METRICS_PUSH_INTERVAL_SECONDS = float(os.getenv("AGENT_METRICS_PUSH_INTERVAL_SECONDS", "30"))
+AGENT_METRICS_HOST = os.getenv("AGENT_METRICS_HOST", "127.0.0.1").strip()
+AGENT_METRICS_PORT = int(os.getenv("AGENT_METRICS_PORT", "0"))
+
+# The bridge's bulk limits, used to size the wait for a bulk answer from the local backend.
+BULK_MAX_CONCURRENCY = 32
+BULK_ACTION_MAX_SECONDS = 60.0
+
+JOB_KINDS = {"device_action", "probe", "tv", "test", "mdc_execute", "group", "mdc_snapshot"}
+
+METRICS.counter("agent_jobs_total", "Jobs finished by the agent.", ("kind", "status"))
+METRICS.histogram("agent_job_duration_seconds", "Time to execute a job, result upload excluded.", ("kind",))
+METRICS.gauge("agent_jobs_running", "Jobs executing right now.")
+METRICS.gauge("agent_result_outbox_pending", "Finished results waiting to be reported to the broker.")
+METRICS.counter("agent_result_report_failures_total", "Result reports the broker did not accept in time.")
+METRICS.histogram("agent_sweep_duration_seconds", "Time to sweep every configured display.")
+METRICS.counter("agent_sweep_failures_total", "Status sweeps that failed.")
+
+
+# job_id -> (lease seconds, last time the lease was granted or extended)
+_running_leases: dict[str, tuple[float, float]] = {}
+_running_leases_lock = threading.Lock()
+# Jobs whose lease the broker refused to extend: already requeued, finished or reaped.
+# Their results are not reported, since the broker may have handed the job out again.
+_lost_jobs: set[str] = set()
+# Lease extension answers that mean the broker no longer holds the job for this agent.
+LEASE_LOST_STATUS_CODES = {403, 404, 409}
+# 4xx answers to a result report worth retrying; any other 4xx rejects the report for good.
+RETRYABLE_REPORT_STATUS_CODES = {401, 408, 429}
+_embedded_bridge: "EmbeddedBridge | None" = None
+# Any successful broker request counts as a heartbeat since agent info rides along.
+_last_broker_contact = 0.0
 
 
 class AgentConfigError(RuntimeError):
     pass
 
 
+class AgentHTTPError(RuntimeError):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class KeepAliveClient:
+    """Persistent HTTP/1.1 connections to one base URL, one per calling thread.
+
+    A request that fails on a reused connection (the server closed it while idle) is
+    retried once on a fresh connection; other failures drop the connection so the next
+    request reconnects.
+    """
+
+    RETRYABLE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionError)
+
+    def __init__(self, base_url: str, gzip_min_bytes: int | None = None):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.path_prefix = parts.path.rstrip("/")
+        self.gzip_min_bytes = gzip_min_bytes
+        self._local = threading.local()
+
+    def _connection(self, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            conn.timeout = timeout
+            return conn, True
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = connection_class(self.host, self.port, timeout=timeout)
+        self._local.conn = conn
+        return conn, False
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes | None,
+        headers: dict[str, str],
+        timeout: float,
+    ) -> tuple[int, bytes]:
+        headers = dict(headers)
+        if body is not None and self.gzip_min_bytes is not None and len(body) >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        retried = False
+        while True:
+            conn, reused = self._connection(timeout)
+            try:
+                conn.request(method, self.path_prefix + path, body=body, headers=headers)
+                response = conn.getresponse()
+                raw = response.read()
+            except self.RETRYABLE_ERRORS:
+                self.close()
+                if reused and not retried:
+                    retried = True
+                    continue
+                raise
+            except Exception:
+                self.close()
+                raise
+            if response.will_close:
+                self.close()
+            return response.status, raw
+
+
+_cloud_client = KeepAliveClient(CLOUD_BASE_URL, AGENT_GZIP_MIN_BYTES if AGENT_GZIP_REQUESTS else None)
+_local_client = KeepAliveClient(LOCAL_BACKEND_URL)
+
+
 def _headers() -> dict[str, str]:
     headers: dict[str, str] = {"Content-Type": "application/json"}
     if AGENT_SHARED_SECRET:
@@ -27,58 +173,78 @@ def _headers() -> dict[str, str]:
     return headers
 
 
-def _json_request(method: str, url: str, payload: dict[str, Any] | None = None) -> dict[str, Any]:
+def _json_request(
+    client: KeepAliveClient,
+    method: str,
+    path: str,
+    payload: dict[str, Any] | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = AGENT_REQUEST_TIMEOUT_SECONDS,
+    label: str = "",
+) -> dict[str, Any]:
     body = None
     if payload is not None:
         body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
 
-    request = Request(url=url, data=body, headers=_headers(), method=method)
+    url = f"{client.base_url}{path}"
     try:
-        with urlopen(request, timeout=AGENT_REQUEST_TIMEOUT_SECONDS) as response:
-            raw = response.read().decode("utf-8")
-            return json.loads(raw) if raw else {}
-    except HTTPError as exc:
-        detail = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"HTTP {exc.code} {url}: {detail}") from exc
-    except URLError as exc:
-        raise RuntimeError(f"Request failed {url}: {exc}") from exc
+        status, raw = client.request(method, path, body, headers or {"Content-Type": "application/json"}, timeout)
+    except (OSError, http.client.HTTPException) as exc:
+        raise RuntimeError(f"{label}Request failed {url}: {exc}") from exc
+
+    text = raw.decode("utf-8", errors="replace")
+    if status >= 400:
+        raise AgentHTTPError(status, f"{label}HTTP {status} {url}: {text}")
+    return json.loads(text) if text else {}
+
+
+def _broker_request(
+    method: str,
+    path: str,
+    payload: dict[str, Any] | None = None,
+    timeout: float = AGENT_REQUEST_TIMEOUT_SECONDS,
+) -> dict[str, Any]:
+    global _last_broker_contact
+    data = _json_request(
+        _cloud_client,
+        method,
+        f"/api/agent/{quote(AGENT_ID)}{path}",
+        payload,
+        headers=_headers(),
+        timeout=timeout,
+    )
+    _last_broker_contact = time.time()
+    return data
 
 
 def _local_get(path: str, query: dict[str, Any] | None = None) -> dict[str, Any]:
-    url = f"{LOCAL_BACKEND_URL}{path}"
     if query:
-        url = f"{url}?{urlencode(query)}"
+        path = f"{path}?{urlencode(query)}"
+    return _json_request(_local_client, "GET", path, label="Local ")
 
-    request = Request(url=url, headers={"Content-Type": "application/json"}, method="GET")
-    try:
-        with urlopen(request, timeout=AGENT_REQUEST_TIMEOUT_SECONDS) as response:
-            raw = response.read().decode("utf-8")
-            return json.loads(raw) if raw else {}
-    except HTTPError as exc:
-        detail = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"Local HTTP {exc.code} {url}: {detail}") from exc
-    except URLError as exc:
-        raise RuntimeError(f"Local request failed {url}: {exc}") from exc
-
-
-def _local_post(path: str, payload: dict[str, Any]) -> dict[str, Any]:
-    url = f"{LOCAL_BACKEND_URL}{path}"
-    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    request = Request(
-        url=url,
-        data=body,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        with urlopen(request, timeout=AGENT_REQUEST_TIMEOUT_SECONDS) as response:
-            raw = response.read().decode("utf-8")
-            return json.loads(raw) if raw else {}
-    except HTTPError as exc:
-        detail = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"Local HTTP {exc.code} {url}: {detail}") from exc
-    except URLError as exc:
-        raise RuntimeError(f"Local request failed {url}: {exc}") from exc
+
+def _local_post(
+    path: str,
+    payload: dict[str, Any],
+    timeout: float = AGENT_REQUEST_TIMEOUT_SECONDS,
+) -> dict[str, Any]:
+    return _json_request(_local_client, "POST", path, payload, timeout=timeout, label="Local ")
+
+
+def _bulk_response_timeout(request: dict[str, Any]) -> float:
+    """How long the local backend may take to answer a bulk request (as in main.rs).
+
+    Targets run in waves of ``concurrency``, and targets on one ip:port one after another;
+    each may use the longest action limit.
+    """
+    targets = request.get("targets") or []
+    concurrency = max(1, min(int(request.get("concurrency") or BULK_MAX_CONCURRENCY), BULK_MAX_CONCURRENCY))
+    per_host: dict[str, int] = {}
+    for target in targets:
+        key = f"{target.get('ip') or target.get('tv_ip')}:{target.get('port')}"
+        per_host[key] = per_host.get(key, 0) + 1
+    rounds = max(-(-len(targets) // concurrency), max(per_host.values(), default=0))
+    return max(AGENT_REQUEST_TIMEOUT_SECONDS, rounds * BULK_ACTION_MAX_SECONDS + 30.0)
 
 
 def _status_to_power_state(command: str) -> str:
@@ -99,7 +265,12 @@ def _target_ip(payload: dict[str, Any], kind: str) -> str:
     return ip
 
 
-def _execute_local_job(job: dict[str, Any]) -> dict[str, Any]:
+# Job payload options forwarded unchanged to the bridge action.
+PASSTHROUGH_JOB_FIELDS = ("priority",)
+
+
+def _local_request_for_job(job: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    """Map a job to a bridge ``(action, payload)``; probes map to ``("probe", {"ip": ...})``."""
     kind = str(job.get("kind", "")).strip().lower()
     payload = job.get("payload") or {}
     if not isinstance(payload, dict):
@@ -110,11 +281,10 @@ def _execute_local_job(job: dict[str, Any]) -> dict[str, Any]:
         action_payload = payload.get("payload")
         if not action or not isinstance(action_payload, dict):
             raise ValueError("device_action payload requires action and payload object")
-        return _local_post("/device_action", {"action": action, "payload": action_payload})
+        return action, action_payload
 
     if kind == "probe":
-        ip = _target_ip(payload, "probe")
-        return _local_get("/auto_probe", {"ip": ip})
+        return "probe", {"ip": _target_ip(payload, "probe")}
 
     if kind == "tv":
         ip = _target_ip(payload, "tv")
@@ -126,7 +296,7 @@ def _execute_local_job(job: dict[str, Any]) -> dict[str, Any]:
             "protocol": payload.get("protocol", "AUTO"),
             "state": _status_to_power_state(str(payload.get("command", ""))),
         }
-        return _local_post("/device_action", {"action": "power", "payload": action_payload})
+        return "power", action_payload
 
     if kind == "test":
         ip = _target_ip(payload, "test")
@@ -137,7 +307,7 @@ def _execute_local_job(job: dict[str, Any]) -> dict[str, Any]:
             "display_id": int(payload.get("display_id", 0)),
             "protocol": payload.get("protocol", "AUTO"),
         }
-        return _local_post("/device_action", {"action": "status", "payload": action_payload})
+        return "status", action_payload
 
     if kind == "mdc_execute":
         ip = _target_ip(payload, "mdc_execute")
@@ -169,52 +339,579 @@ def _execute_local_job(job: dict[str, Any]) -> dict[str, Any]:
             "command": command,
             "args": args,
         }
-        return _local_post("/device_action", {"action": action, "payload": action_payload})
+        return action, action_payload
+
+    if kind == "group":
+        action = str(payload.get("action", "")).strip()
+        targets = payload.get("targets")
+        common = payload.get("payload") or {}
+        if not action:
+            raise ValueError("group payload requires action")
+        if not isinstance(targets, list) or not targets:
+            raise ValueError("group payload requires a non-empty targets array")
+        if not isinstance(common, dict):
+            raise ValueError("group payload.payload must be an object")
+
+        # A group is one operator action, so it is not demoted to the bulk sweep lane.
+        action_payload = {
+            "action": action,
+            "targets": targets,
+            "payload": {"priority": payload.get("priority") or "interactive", **common},
+            "concurrency": int(payload.get("concurrency") or AGENT_GROUP_CONCURRENCY),
+        }
+        return "bulk", action_payload
+
+    if kind == "mdc_snapshot":
+        ip = _target_ip(payload, "mdc_snapshot")
+        commands = payload.get("commands")
+        if not isinstance(commands, list) or not commands:
+            raise ValueError("mdc_snapshot payload requires a commands array")
+
+        action_payload = {
+            "tv_ip": ip,
+            "ip": ip,
+            "port": int(payload.get("port", 1515)),
+            "display_id": int(payload.get("display_id", 0)),
+            "protocol": payload.get("protocol", "AUTO"),
+            "commands": commands,
+        }
+        return "snapshot", action_payload
 
     raise ValueError(f"Unsupported job kind: {kind}")
 
 
-def _heartbeat() -> None:
-    payload = {
+class EmbeddedBridge:
+    """Runs bridge actions on the agent's own event loop, skipping the local backend hop."""
+
+    def __init__(self, bridge_module):
+        self._bridge = bridge_module
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="bridge-loop", daemon=True).start()
+
+    async def _probe(self, ip: str) -> dict[str, Any]:
+        # Same shape as the backend's /auto_probe response.
+        if await self._bridge.probe_tcp(ip, 1515):
+            return {"ok": True, "ip": ip, "port": 1515, "protocol": "SIGNAGE_MDC"}
+        return {"ok": False, "ip": ip, "error": "No known ports open (1515)"}
+
+    def run(self, action: str, payload: dict[str, Any]) -> dict[str, Any]:
+        if action == "probe":
+            coro = self._probe(payload["ip"])
+        else:
+            coro = self._bridge.main_async(action, payload)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+
+def _load_embedded_bridge() -> "EmbeddedBridge | None":
+    if AGENT_EXECUTION_MODE == "http":
+        return None
+    if AGENT_EXECUTION_MODE not in {"auto", "embedded"}:
+        raise AgentConfigError("AGENT_EXECUTION_MODE must be auto|embedded|http")
+    try:
+        import bridge
+    except ImportError as exc:
+        if AGENT_EXECUTION_MODE == "embedded":
+            raise AgentConfigError(f"Embedded execution requires bridge.py and samsung_mdc: {exc}") from exc
+        print(f"[agent] bridge not importable ({exc}); using local backend over HTTP")
+        return None
+    return EmbeddedBridge(bridge)
+
+
+def _execute_local_job(job: dict[str, Any]) -> dict[str, Any]:
+    action, action_payload = _local_request_for_job(job)
+    job_payload = job.get("payload") or {}
+    for field in PASSTHROUGH_JOB_FIELDS:
+        if field in job_payload and action != "probe":
+            action_payload.setdefault(field, job_payload[field])
+    if job.get("trace_id") and action not in {"probe", "bulk"}:
+        # The bridge answers traced calls with their queue/connect/command timings.
+        action_payload.setdefault("trace_id", job["trace_id"])
+    if _embedded_bridge is not None:
+        return _embedded_bridge.run(action, action_payload)
+    if action == "probe":
+        return _local_get("/auto_probe", {"ip": action_payload["ip"]})
+    timeout = _bulk_response_timeout(action_payload) if action == "bulk" else AGENT_REQUEST_TIMEOUT_SECONDS
+    return _local_post("/device_action", {"action": action, "payload": action_payload}, timeout)
+
+
+def _agent_info() -> dict[str, Any]:
+    return {
         "version": "option-b-agent-1",
         "hostname": socket.gethostname(),
         "local_backend_url": LOCAL_BACKEND_URL,
+        "execution_mode": "embedded" if _embedded_bridge is not None else "http",
     }
-    _json_request("POST", f"{CLOUD_BASE_URL}/api/agent/{quote(AGENT_ID)}/heartbeat", payload)
 
 
-def _poll_once() -> int:
-    data = _json_request(
+def _heartbeat() -> None:
+    _broker_request("POST", "/heartbeat", _agent_info())
+
+
+def _extend_due_leases() -> None:
+    now = time.time()
+    with _running_leases_lock:
+        due = [
+            (job_id, lease_s)
+            for job_id, (lease_s, granted_at) in _running_leases.items()
+            if now - granted_at >= lease_s / 2
+        ]
+
+    for job_id, lease_s in due:
+        try:
+            _broker_request("POST", f"/jobs/{quote(job_id)}/lease", {"extend_s": lease_s})
+        except AgentHTTPError as exc:
+            if exc.code not in LEASE_LOST_STATUS_CODES:
+                print(f"[agent] lease extension failed for {job_id}: {exc}")
+                continue
+            with _running_leases_lock:
+                _running_leases.pop(job_id, None)
+                _lost_jobs.add(job_id)
+            print(f"[agent] lease for {job_id} lost ({exc}); its result will not be reported")
+            continue
+        except Exception as exc:
+            print(f"[agent] lease extension failed for {job_id}: {exc}")
+            continue
+        with _running_leases_lock:
+            if job_id in _running_leases:
+                _running_leases[job_id] = (lease_s, time.time())
+
+
+def _lease_keeper() -> None:
+    """Keep leases of long-running jobs alive so the broker does not redeliver them."""
+    while True:
+        time.sleep(1)
+        try:
+            _extend_due_leases()
+        except Exception as exc:
+            print(f"[agent] lease keeper error: {exc}")
+
+
+def _job_lane_key(job: dict[str, Any]) -> str:
+    payload = job.get("payload") or {}
+    if isinstance(payload, dict):
+        nested = payload.get("payload")
+        for source in (payload, nested if isinstance(nested, dict) else {}):
+            ip = str(source.get("tv_ip") or source.get("ip") or "").strip()
+            if ip:
+                return ip
+    return f"job:{job.get('job_id')}"
+
+
+def _release_leases(reports: list[dict[str, Any]]) -> None:
+    with _running_leases_lock:
+        for report in reports:
+            _running_leases.pop(report["job_id"], None)
+
+
+def _drop_lost_reports(reports: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Remove reports of jobs whose lease was lost; returns the dropped ones."""
+    with _running_leases_lock:
+        lost = [report for report in reports if report["job_id"] in _lost_jobs]
+        for report in lost:
+            _lost_jobs.discard(report["job_id"])
+    if lost:
+        reports[:] = [report for report in reports if report not in lost]
+        print(f"[agent] not reporting {len(lost)} result(s) of jobs whose lease was lost")
+    return lost
+
+
+def _is_permanent_rejection(exc: Exception) -> bool:
+    """A 4xx answer that will not change on retry; 5xx and network errors are transient."""
+    return (
+        isinstance(exc, AgentHTTPError)
+        and 400 <= exc.code < 500
+        and exc.code not in RETRYABLE_REPORT_STATUS_CODES
+    )
+
+
+class ResultOutbox:
+    """Collects finished job results and reports them to the broker in batches.
+
+    A job's lease stays registered until its result is delivered, so the lease keeper
+    keeps it alive while a report waits here or is being retried.
+    """
+
+    def __init__(self, linger_s: float, max_batch: int):
+        self.linger_s = max(0.0, linger_s)
+        self.max_batch = max(1, max_batch)
+        self._lock = threading.Condition()
+        self._pending: list[dict[str, Any]] = []
+        # job_id -> monotonic time the job finished, for the result_upload span.
+        self._finished_at: dict[str, float] = {}
+        self._batch_supported = True
+
+    def put(self, report: dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append(report)
+            self._finished_at[report["job_id"]] = time.monotonic()
+            self._lock.notify()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, name="result-outbox", daemon=True).start()
+
+    def _take_batch(self) -> list[dict[str, Any]]:
+        with self._lock:
+            while not self._pending:
+                self._lock.wait()
+        # Let other jobs that are about to finish join this request.
+        time.sleep(self.linger_s)
+        with self._lock:
+            batch = self._pending[: self.max_batch]
+            del self._pending[: len(batch)]
+            return batch
+
+    def _stamp_upload_wait(self, batch: list[dict[str, Any]]) -> None:
+        now = time.monotonic()
+        for report in batch:
+            finished_at = self._finished_at.get(report["job_id"])
+            if finished_at is not None and isinstance(report.get("spans"), dict):
+                report["spans"]["result_upload"] = round((now - finished_at) * 1000, 1)
+
+    def _delivered(self, reports: list[dict[str, Any]]) -> None:
+        _release_leases(reports)
+        with self._lock:
+            for report in reports:
+                self._finished_at.pop(report["job_id"], None)
+
+    def _send_batch(self, batch: list[dict[str, Any]]) -> None:
+        # A lease can be lost while its result waits here, so check on every attempt.
+        lost = _drop_lost_reports(batch)
+        if lost:
+            self._delivered(lost)
+        if not batch:
+            return
+        # Stamped on every attempt, so retries count towards the upload time.
+        self._stamp_upload_wait(batch)
+        if self._batch_supported:
+            try:
+                _broker_request("POST", "/results", {"results": batch, "agent": _agent_info()})
+                self._delivered(batch)
+                return
+            except AgentHTTPError as exc:
+                if exc.code == 404:
+                    print("[agent] broker has no batch results endpoint; reporting per job")
+                    self._batch_supported = False
+                elif not _is_permanent_rejection(exc):
+                    raise
+                else:
+                    # One report (say, an oversized result) spoils the batch; find it.
+                    print(f"[agent] broker rejected a batch of {len(batch)} result(s) ({exc}); reporting per job")
+
+        for index, report in enumerate(batch):
+            try:
+                _broker_request("POST", f"/jobs/{quote(report['job_id'])}/result", report)
+            except Exception as exc:
+                if not _is_permanent_rejection(exc):
+                    # Retry whatever has not been delivered yet.
+                    del batch[:index]
+                    raise
+                # Unknown or foreign job, or a report the broker cannot take; do not retry it.
+                print(f"[agent] broker rejected result for {report['job_id']}: {exc}")
+            self._delivered([report])
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            while True:
+                try:
+                    self._send_batch(batch)
+                    break
+                except Exception as exc:
+                    METRICS.inc("agent_result_report_failures_total")
+                    print(f"[agent] could not report {len(batch)} result(s): {exc}")
+                    time.sleep(max(AGENT_POLL_INTERVAL_SECONDS, 2))
+
+
+_result_outbox = ResultOutbox(AGENT_RESULT_BATCH_LINGER_SECONDS, AGENT_RESULT_BATCH_MAX)
+
+
+def _collect_agent_metrics(registry) -> None:
+    registry.set("agent_result_outbox_pending", (), _result_outbox.pending)
+
+
+METRICS.add_collector(_collect_agent_metrics)
+
+
+# Bridge timings forwarded as job spans.
+BRIDGE_SPAN_FIELDS = ("mdc_queue", "mdc_connect", "mdc_command")
+
+
+def _job_spans(received_at: float, started: float, finished: float, result: Any) -> dict[str, float]:
+    """Agent-side spans in ms; ``local_backend`` is execution time the bridge did not account for."""
+    spans = {
+        "agent_pickup": round((started - received_at) * 1000, 1),
+        "execute": round((finished - started) * 1000, 1),
+    }
+    timing = result.get("timing_ms") if isinstance(result, dict) else None
+    if isinstance(timing, dict) and "bridge_total" in timing:
+        spans["local_backend"] = round(max(0.0, spans["execute"] - float(timing["bridge_total"])), 1)
+        for field in BRIDGE_SPAN_FIELDS:
+            if field in timing:
+                spans[field] = float(timing[field])
+    return spans
+
+
+def _run_job(job: dict[str, Any], received_at: float) -> None:
+    job_id = str(job.get("job_id", "")).strip()
+    kind = str(job.get("kind", "")).strip().lower()
+    kind = kind if kind in JOB_KINDS else "other"
+    METRICS.inc("agent_jobs_running")
+    started = time.monotonic()
+    result = None
+    try:
+        result = _execute_local_job(job)
+        status = "success"
+        report = {"job_id": job_id, "status": "success", "result": result, "error": None}
+        print(f"[agent] completed job {job_id} ({job.get('kind')})")
+    except Exception as exc:
+        status = "error"
+        report = {"job_id": job_id, "status": "error", "result": None, "error": str(exc)}
+        print(f"[agent] failed job {job_id}: {exc}")
+    finally:
+        METRICS.inc("agent_jobs_running", (), -1)
+    finished = time.monotonic()
+    report["spans"] = _job_spans(received_at, started, finished, result)
+    _result_outbox.put(report)
+    METRICS.inc("agent_jobs_total", (kind, status))
+    METRICS.observe("agent_job_duration_seconds", (kind,), finished - started)
+
+
+class JobRunner:
+    """Runs jobs on a thread pool, one lane per target IP.
+
+    Jobs for the same display run one after another in arrival order; different
+    displays run in parallel up to ``workers`` jobs in flight.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="agent-job")
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._lanes: dict[str, deque] = {}
+        self._active = 0
+
+    def wait_for_free_slots(self, timeout: float) -> int:
+        with self._slot_freed:
+            if self._active >= self.workers:
+                self._slot_freed.wait(timeout)
+            return max(0, self.workers - self._active)
+
+    def submit(self, job: dict[str, Any]) -> None:
+        key = _job_lane_key(job)
+        entry = (job, time.monotonic())
+        with self._lock:
+            self._active += 1
+            lane = self._lanes.get(key)
+            if lane is not None:
+                # A worker is already draining this display's lane.
+                lane.append(entry)
+                return
+            self._lanes[key] = deque([entry])
+        self._executor.submit(self._drain_lane, key)
+
+    def _drain_lane(self, key: str) -> None:
+        while True:
+            with self._lock:
+                lane = self._lanes[key]
+                if not lane:
+                    del self._lanes[key]
+                    return
+                # Stays queued while running so later jobs for this display wait behind it.
+                job, received_at = lane[0]
+            try:
+                _run_job(job, received_at)
+            finally:
+                with self._slot_freed:
+                    lane.popleft()
+                    self._active -= 1
+                    self._slot_freed.notify_all()
+
+
+def _poll_once(runner: JobRunner) -> int:
+    free_slots = runner.wait_for_free_slots(AGENT_REQUEST_TIMEOUT_SECONDS)
+    if free_slots == 0:
+        return 0
+
+    data = _broker_request(
         "POST",
-        f"{CLOUD_BASE_URL}/api/agent/{quote(AGENT_ID)}/poll",
-        {"max_jobs": AGENT_MAX_JOBS_PER_POLL},
+        "/poll",
+        {
+            "max_jobs": min(AGENT_MAX_JOBS_PER_POLL, free_slots),
+            "wait_s": AGENT_POLL_WAIT_SECONDS,
+            "agent": _agent_info(),
+        },
+        timeout=AGENT_REQUEST_TIMEOUT_SECONDS + AGENT_POLL_WAIT_SECONDS,
     )
     jobs = data.get("jobs") or []
     if not isinstance(jobs, list):
         return 0
 
+    # Every job in the batch is leased from now on, including ones still waiting their turn.
+    received_at = time.time()
+    with _running_leases_lock:
+        for job in jobs:
+            # A redelivered job is ours again, even if an earlier lease was lost.
+            _lost_jobs.discard(str(job.get("job_id")))
+            lease_s = float(job.get("lease_s") or 0)
+            if job.get("job_id") and lease_s > 0:
+                _running_leases[str(job["job_id"])] = (lease_s, received_at)
+
     for job in jobs:
-        job_id = str(job.get("job_id", "")).strip()
-        if not job_id:
-            continue
+        if str(job.get("job_id", "")).strip():
+            runner.submit(job)
 
-        try:
-            result = _execute_local_job(job)
-            _json_request(
-                "POST",
-                f"{CLOUD_BASE_URL}/api/agent/{quote(AGENT_ID)}/jobs/{quote(job_id)}/result",
-                {"status": "success", "result": result, "error": None},
+    return len(jobs)
+
+
+SWEEP_STATUS_FIELDS = ("power", "input_source", "mute")
+
+
+def _load_sweep_targets() -> list[dict[str, Any]]:
+    targets: list[dict[str, Any]] = []
+    if AGENT_SWEEP_TARGETS_FILE:
+        with open(AGENT_SWEEP_TARGETS_FILE, "r", encoding="utf-8") as handle:
+            entries = json.load(handle)
+        if not isinstance(entries, list):
+            raise AgentConfigError("AGENT_SWEEP_TARGETS_FILE must contain a JSON array")
+        for entry in entries:
+            ip = str(entry.get("ip") or entry.get("tv_ip") or "").strip() if isinstance(entry, dict) else ""
+            if not ip:
+                raise AgentConfigError(f"Sweep target without ip: {entry}")
+            targets.append(
+                {"ip": ip, "port": int(entry.get("port", 1515)), "display_id": int(entry.get("display_id", 0))}
             )
-            print(f"[agent] completed job {job_id} ({job.get('kind')})")
-        except Exception as exc:
-            _json_request(
-                "POST",
-                f"{CLOUD_BASE_URL}/api/agent/{quote(AGENT_ID)}/jobs/{quote(job_id)}/result",
-                {"status": "error", "result": None, "error": str(exc)},
+    for item in AGENT_SWEEP_TARGETS.split(","):
+        ip, _sep, port = item.strip().partition(":")
+        if ip:
+            targets.append({"ip": ip, "port": int(port or 1515), "display_id": 0})
+    return targets
+
+
+class StatusSweeper:
+    """Sweeps the configured displays and reports changed fields to the broker.
+
+    Only the difference from the last state the broker acknowledged is sent, so a report
+    that fails is folded into the next one. The first report after start, or after the
+    broker asks for a resync, carries every display.
+    """
+
+    def __init__(self, targets: list[dict[str, Any]], interval_s: float):
+        self.targets = targets
+        self.interval_s = max(1.0, interval_s)
+        self._acked: dict[str, dict[str, Any]] | None = None
+
+    @staticmethod
+    def _target_key(target: dict[str, Any]) -> str:
+        return f"{target['ip']}:{target['port']}:{target['display_id']}"
+
+    def _sweep(self) -> dict[str, dict[str, Any]]:
+        request = {
+            "action": "status",
+            "targets": self.targets,
+            "payload": {"priority": "background"},
+            "concurrency": AGENT_SWEEP_CONCURRENCY,
+        }
+        if _embedded_bridge is not None:
+            response = _embedded_bridge.run("bulk", request)
+        else:
+            response = _local_post(
+                "/device_action",
+                {"action": "bulk", "payload": request},
+                _bulk_response_timeout(request),
             )
-            print(f"[agent] failed job {job_id}: {exc}")
 
-    return len(jobs)
+        observed: dict[str, dict[str, Any]] = {}
+        for item in (response.get("data") or {}).get("results") or []:
+            target = self.targets[int(item["index"])]
+            status = (item.get("data") or {}).get("status") if item.get("ok") else None
+            fields: dict[str, Any] = {"reachable": bool(status)}
+            if status:
+                fields.update({field: status.get(field) for field in SWEEP_STATUS_FIELDS})
+            observed[self._target_key(target)] = fields
+        return observed
+
+    def _changes(self, observed: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+        observed_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        changes = []
+        for target in self.targets:
+            key = self._target_key(target)
+            fields = observed.get(key)
+            if fields is None:
+                continue
+            previous = (self._acked or {}).get(key, {})
+            delta = {field: value for field, value in fields.items() if previous.get(field) != value}
+            if delta:
+                changes.append({**target, "fields": delta, "observed_at": observed_at})
+        return changes
+
+    def sweep_once(self) -> int:
+        started = time.perf_counter()
+        observed = self._sweep()
+        METRICS.observe("agent_sweep_duration_seconds", (), time.perf_counter() - started)
+        full = self._acked is None
+        changes = self._changes(observed)
+        # Posted even when empty: it doubles as a heartbeat and lets a restarted broker
+        # ask for a resync.
+        response = _broker_request(
+            "POST", "/status", {"changes": changes, "full": full, "agent": _agent_info()}
+        )
+        if response.get("resync"):
+            self._acked = None
+            return 0
+
+        acked = {} if full else dict(self._acked or {})
+        for key, fields in observed.items():
+            acked[key] = {**acked.get(key, {}), **fields}
+        self._acked = acked
+        return len(changes)
+
+    def run(self) -> None:
+        while True:
+            started = time.time()
+            try:
+                changed = self.sweep_once()
+                if changed:
+                    print(f"[agent] status sweep reported {changed} changed display(s)")
+            except Exception as exc:
+                METRICS.inc("agent_sweep_failures_total")
+                print(f"[agent] status sweep failed: {exc}")
+            time.sleep(max(0.0, self.interval_s - (time.time() - started)))
+
+
+def _metrics_pusher() -> None:
+    """Push this agent's metrics to the broker, which serves them labelled by agent_id."""
+    while True:
+        time.sleep(AGENT_METRICS_PUSH_INTERVAL_SECONDS)
+        try:
+            _broker_request("POST", "/metrics", {"metrics": METRICS.snapshot(), "agent": _agent_info()})
+        except AgentHTTPError as exc:
+            if exc.code == 404:
+                print("[agent] broker has no metrics endpoint; metrics push disabled")
+                return
+            print(f"[agent] metrics push failed: {exc}")
+        except Exception as exc:
+            print(f"[agent] metrics push failed: {exc}")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        data = render_metrics([({}, METRICS.snapshot())]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
 
 
 def _validate_config() -> None:
@@ -229,20 +926,40 @@ def _validate_config() -> None:
 
 
 def main() -> None:
+    global _embedded_bridge
     _validate_config()
-    print(f"[agent] starting: agent_id={AGENT_ID} cloud={CLOUD_BASE_URL} local={LOCAL_BACKEND_URL}")
+    _embedded_bridge = _load_embedded_bridge()
+    local = "embedded" if _embedded_bridge is not None else LOCAL_BACKEND_URL
+    print(f"[agent] starting: agent_id={AGENT_ID} cloud={CLOUD_BASE_URL} local={local}")
+
+    threading.Thread(target=_lease_keeper, name="lease-keeper", daemon=True).start()
+    _result_outbox.start()
+    if AGENT_METRICS_PUSH_INTERVAL_SECONDS > 0:
+        threading.Thread(target=_metrics_pusher, name="metrics-pusher", daemon=True).start()
+    if AGENT_METRICS_PORT > 0:
+        metrics_server = ThreadingHTTPServer((AGENT_METRICS_HOST, AGENT_METRICS_PORT), MetricsHandler)
+        threading.Thread(target=metrics_server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[agent] serving metrics on http://{AGENT_METRICS_HOST}:{AGENT_METRICS_PORT}/metrics")
+    sweep_targets = _load_sweep_targets()
+    if sweep_targets and AGENT_SWEEP_INTERVAL_SECONDS > 0:
+        sweeper = StatusSweeper(sweep_targets, AGENT_SWEEP_INTERVAL_SECONDS)
+        threading.Thread(target=sweeper.run, name="status-sweeper", daemon=True).start()
+        print(f"[agent] sweeping {len(sweep_targets)} display(s) every {sweeper.interval_s:.0f}s")
+    runner = JobRunner(AGENT_WORKERS)
 
-    last_heartbeat = 0.0
     while True:
-        now = time.time()
         try:
-            if now - last_heartbeat >= 15:
+            # Polls and result reports carry agent info, so a busy agent never needs this.
+            if time.time() - _last_broker_contact >= AGENT_HEARTBEAT_INTERVAL_SECONDS:
                 _heartbeat()
-                last_heartbeat = now
 
-            jobs_count = _poll_once()
-            if jobs_count == 0:
-                time.sleep(AGENT_POLL_INTERVAL_SECONDS)
+            poll_started = time.time()
+            jobs_count = _poll_once(runner)
+            # A held long poll already waited; only sleep when the broker answered at once
+            # (long polling disabled, or an older broker that ignores wait_s).
+            poll_elapsed = time.time() - poll_started
+            if jobs_count == 0 and poll_elapsed < AGENT_POLL_INTERVAL_SECONDS:
+                time.sleep(AGENT_POLL_INTERVAL_SECONDS - poll_elapsed)
         except Exception as exc:
             print(f"[agent] loop error: {exc}")
             time.sleep(max(AGENT_POLL_INTERVAL_SECONDS, 2))
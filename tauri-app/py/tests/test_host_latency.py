@@ -0,0 +1,71 @@
+import argparse
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import bridge
+from mdc_simulator import DisplaySimulator, build_parser
+
+SIMULATOR_PORT = 15791
+
+
+class HostLatencyTrackerTest(unittest.TestCase):
+    def test_timeout_backs_off_until_next_sample(self):
+        tracker = bridge.HostLatencyTracker()
+        for _ in range(20):
+            tracker.record("h:1515", "response", 0.02)
+        self.assertEqual(tracker.timeout("h:1515", "response", 1.0, 5.0), 1.0)
+
+        tracker.record_timeout("h:1515", "response", 1.0)
+        self.assertEqual(tracker.timeout("h:1515", "response", 1.0, 5.0), 2.0)
+        tracker.record_timeout("h:1515", "response", 2.0)
+        self.assertEqual(tracker.timeout("h:1515", "response", 1.0, 5.0), 4.0)
+        tracker.record_timeout("h:1515", "response", 4.0)
+        self.assertEqual(tracker.timeout("h:1515", "response", 1.0, 5.0), 5.0)
+
+        # A slow sample replaces the backoff and keeps the limit above itself.
+        tracker.record("h:1515", "response", 1.5)
+        self.assertGreater(tracker.timeout("h:1515", "response", 1.0, 5.0), 1.5)
+
+    def test_connect_timeout_backs_off(self):
+        tracker = bridge.HostLatencyTracker()
+        for _ in range(20):
+            tracker.record("h:1515", "connect", 0.001)
+        self.assertEqual(tracker.timeout("h:1515", "connect", 0.3, 1.0), 0.3)
+        tracker.record_timeout("h:1515", "connect", 0.3)
+        self.assertEqual(tracker.timeout("h:1515", "connect", 0.3, 1.0), 0.6)
+
+
+class SlowedDownHostTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.options: argparse.Namespace = build_parser().parse_args(
+            ["--base-port", str(SIMULATOR_PORT), "--count", "1"]
+        )
+        self.simulator = DisplaySimulator(self.options)
+        await self.simulator.start()
+
+    async def asyncTearDown(self):
+        await bridge.CONNECTION_POOL.close()
+        self.simulator.close()
+
+    async def test_status_recovers_after_host_slows_down(self):
+        payload = {"ip": "127.0.0.1", "port": SIMULATOR_PORT, "max_age": 0}
+        key = f"127.0.0.1:{SIMULATOR_PORT}"
+        for _ in range(20):
+            await bridge.do_signage_action("status", payload)
+        self.assertEqual(bridge.resolve_device_timeouts("status", payload, key)[1], 1.0)
+
+        self.options.latency_ms = 1500
+        with self.assertRaises(bridge.MDCTimeoutError):
+            await bridge.do_signage_action("status", payload)
+        self.assertEqual(bridge.resolve_device_timeouts("status", payload, key)[1], 2.0)
+
+        result = await bridge.do_signage_action("status", payload)
+        self.assertEqual(result["status"]["power"], "ON")
+        self.assertGreater(bridge.resolve_device_timeouts("status", payload, key)[1], 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import json.encoder
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import web_backend
+
+
+class JobEventSpansTest(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(web_backend, "_job_store", None),
+            mock.patch.dict(web_backend._remote_jobs, clear=True),
+            mock.patch.dict(web_backend._job_clock, clear=True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.job = {"job_id": "j1", "agent_id": "a1", "status": "dispatched", "spans": {"queue_wait": 1.0}}
+        web_backend._remote_jobs["j1"] = self.job
+        web_backend._job_clock["j1"] = {"created": time.monotonic(), "dispatched": time.monotonic()}
+
+    def _record_event(self) -> dict:
+        with web_backend._remote_lock:
+            web_backend._record_job_event(self.job)
+            return web_backend._job_events[-1][1]
+
+    def test_event_keeps_the_spans_it_was_recorded_with(self):
+        event = self._record_event()
+        with web_backend._remote_lock:
+            web_backend._merge_job_spans(self.job, {"execute": 5.0, "agent_pickup": 2.0})
+        self.assertEqual(event["spans"], {"queue_wait": 1.0})
+        self.assertIn("execute", self.job["spans"])
+
+    def test_merge_while_event_is_serialized(self):
+        latest = [self._record_event()]
+        stop = threading.Event()
+        errors = []
+
+        def serialize() -> None:
+            # Like _write_sse: events are turned into JSON after the lock is released.
+            while not stop.is_set():
+                try:
+                    json.dumps(latest[0])
+                except RuntimeError as exc:
+                    errors.append(exc)
+                    return
+
+        reported = {stage: 1.0 for stage in web_backend.AGENT_SPAN_STAGES}
+        serializer = threading.Thread(target=serialize)
+        # The C encoder holds the GIL for a whole dump; the Python one lets a merge interleave.
+        encoder_patch = mock.patch.object(json.encoder, "c_make_encoder", None)
+        encoder_patch.start()
+        self.addCleanup(encoder_patch.stop)
+        serializer.start()
+        try:
+            for _ in range(300):
+                # Many stages make each serialization long enough to overlap a merge.
+                self.job["spans"] = {f"stage_{index}": 1.0 for index in range(2000)}
+                latest[0] = self._record_event()
+                time.sleep(0)
+                with web_backend._remote_lock:
+                    web_backend._merge_job_spans(self.job, reported)
+        finally:
+            stop.set()
+            serializer.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import http.client
+import json
+import sys
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import web_backend
+from metrics import MetricsRegistry, render, validate_snapshot
+
+
+def _snapshot() -> dict:
+    registry = MetricsRegistry()
+    registry.counter("agent_jobs_total", "Jobs run.", ("kind",))
+    registry.histogram("agent_job_duration_seconds", "Job duration.", ("kind",))
+    registry.inc("agent_jobs_total", ("status",))
+    registry.observe("agent_job_duration_seconds", ("status",), 0.2)
+    return registry.snapshot()
+
+
+def _malformed_snapshots() -> list[dict]:
+    missing_help = _snapshot()
+    del missing_help["agent_jobs_total"]["help"]
+    missing_sum = _snapshot()
+    del missing_sum["agent_job_duration_seconds"]["series"][0]["sum"]
+    text_count = _snapshot()
+    text_count["agent_job_duration_seconds"]["series"][0]["count"] = "1"
+    text_bucket = _snapshot()
+    text_bucket["agent_job_duration_seconds"]["series"][0]["buckets"][0] = None
+    text_value = _snapshot()
+    text_value["agent_jobs_total"]["series"][0]["value"] = "many"
+    return [missing_help, missing_sum, text_count, text_bucket, text_value]
+
+
+class ValidateSnapshotTest(unittest.TestCase):
+    def test_valid_snapshot_renders(self):
+        text = render([({"agent_id": "a1"}, validate_snapshot(_snapshot()))])
+        self.assertIn('agent_jobs_total{agent_id="a1",kind="status"} 1', text)
+        self.assertIn('agent_job_duration_seconds_count{agent_id="a1",kind="status"} 1', text)
+
+    def test_rejects_what_render_cannot_format(self):
+        for snapshot in _malformed_snapshots():
+            with self.assertRaises(ValueError):
+                validate_snapshot(snapshot)
+
+    def test_help_keeps_quotes_and_labels_escape_them(self):
+        registry = MetricsRegistry()
+        registry.counter("agent_jobs_total", 'Jobs "run"\\done\nlast line.', ("kind",))
+        registry.inc("agent_jobs_total", ('say "hi"',))
+        text = render([({}, registry.snapshot())])
+        self.assertIn('# HELP agent_jobs_total Jobs "run"\\\\done\\nlast line.', text)
+        self.assertIn('agent_jobs_total{kind="say \\"hi\\""} 1', text)
+
+
+class AgentMetricsPushTest(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(web_backend, "CLOUD_API_KEY", "test-key"),
+            mock.patch.object(web_backend, "AGENT_SHARED_SECRET", "test-secret"),
+            mock.patch.dict(web_backend._agent_metrics, clear=True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        handler = type("QuietHandler", (web_backend.Handler,), {"log_message": lambda *args: None})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def _request(self, method: str, path: str, body: dict | None = None, headers: dict | None = None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=10)
+        try:
+            data = json.dumps(body).encode("utf-8") if body is not None else None
+            conn.request(method, path, body=data, headers={"Content-Type": "application/json", **(headers or {})})
+            response = conn.getresponse()
+            return response.status, response.read().decode("utf-8")
+        finally:
+            conn.close()
+
+    def test_malformed_push_does_not_break_scrape(self):
+        agent_headers = {"x-agent-token": "test-secret"}
+        for snapshot in _malformed_snapshots():
+            status, _body = self._request("POST", "/api/agent/bad/metrics", {"metrics": snapshot}, agent_headers)
+            self.assertEqual(status, 400)
+        status, _body = self._request("POST", "/api/agent/good/metrics", {"metrics": _snapshot()}, agent_headers)
+        self.assertEqual(status, 200)
+
+        status, text = self._request("GET", "/metrics", headers={"x-api-key": "test-key"})
+        self.assertEqual(status, 200)
+        self.assertIn('agent_jobs_total{agent_id="good",kind="status"} 1', text)
+        self.assertNotIn('agent_id="bad"', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
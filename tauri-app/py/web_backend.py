@@ -1,14 +1,28 @@
 import asyncio
+import gzip
 import json
 import os
+import queue
+import re
+import signal
 import socket
+import time
+from collections import OrderedDict, deque
 from datetime import datetime, timezone
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from threading import Lock
+from threading import Condition, Lock, Thread
 from uuid import uuid4
 from urllib.parse import parse_qs, urlparse
 
-from bridge import main_async
+from bridge import (
+    iter_bulk_actions,
+    iter_discovery,
+    main_async,
+    parse_bulk_request,
+    parse_discovery_request,
+)
+from job_store import SqliteJobStore
+from metrics import METRICS, ContendedLock, render as render_metrics, validate_snapshot
 
 HOST = "127.0.0.1"
 PORT = 8765
@@ -21,17 +35,477 @@ REMOTE_AUTH_REQUIRED = os.getenv("REMOTE_AUTH_REQUIRED", "true").strip().lower()
 }
 CLOUD_API_KEY = os.getenv("CLOUD_API_KEY", "").strip()
 AGENT_SHARED_SECRET = os.getenv("AGENT_SHARED_SECRET", "").strip()
-
-_remote_lock = Lock()
+REMOTE_POLL_MAX_WAIT_SECONDS = float(os.getenv("REMOTE_POLL_MAX_WAIT_SECONDS", "25"))
+REMOTE_JOB_MAX_WAIT_SECONDS = float(os.getenv("REMOTE_JOB_MAX_WAIT_SECONDS", "30"))
+REMOTE_JOB_EVENT_BUFFER = int(os.getenv("REMOTE_JOB_EVENT_BUFFER", "2000"))
+REMOTE_JOB_RETENTION_SECONDS = float(os.getenv("REMOTE_JOB_RETENTION_SECONDS", "3600"))
+REMOTE_JOB_MAX_TERMINAL = int(os.getenv("REMOTE_JOB_MAX_TERMINAL", "10000"))
+REMOTE_JOB_MAX_RESULT_BYTES = int(os.getenv("REMOTE_JOB_MAX_RESULT_BYTES", "65536"))
+REMOTE_JOB_REAPER_INTERVAL_SECONDS = float(os.getenv("REMOTE_JOB_REAPER_INTERVAL_SECONDS", "30"))
+REMOTE_JOB_DB_PATH = os.getenv("REMOTE_JOB_DB_PATH", "").strip()
+REMOTE_JOB_LEASE_SECONDS = float(os.getenv("REMOTE_JOB_LEASE_SECONDS", "60"))
+REMOTE_JOB_MAX_LEASE_SECONDS = float(os.getenv("REMOTE_JOB_MAX_LEASE_SECONDS", "900"))
+REMOTE_JOB_MAX_ATTEMPTS = int(os.getenv("REMOTE_JOB_MAX_ATTEMPTS", "3"))
+HTTP_KEEPALIVE_TIMEOUT_SECONDS = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT_SECONDS", "75"))
+MIN_LEASE_SECONDS = 5.0
+LEASE_CHECK_INTERVAL_SECONDS = 1.0
+JOB_EVENTS_KEEPALIVE_SECONDS = 15.0
+TERMINAL_JOB_STATUSES = {"completed", "failed", "dead_letter"}
+# Pushed agent metrics older than this are left out of /metrics (agent stopped or gone).
+AGENT_METRICS_MAX_AGE_SECONDS = 300.0
+# Job timing stages (job["spans"], milliseconds) in pipeline order. queue_wait and
+# agent_roundtrip are measured by the broker, the rest are reported by the agent.
+JOB_SPAN_STAGES = (
+    "queue_wait",
+    "agent_pickup",
+    "execute",
+    "local_backend",
+    "mdc_queue",
+    "mdc_connect",
+    "mdc_command",
+    "result_upload",
+    "agent_roundtrip",
+)
+AGENT_SPAN_STAGES = set(JOB_SPAN_STAGES) - {"queue_wait", "agent_roundtrip"}
+TIMING_PERCENTILES = (50, 95, 99)
+
+METRICS.histogram("broker_lock_wait_seconds", "Time spent waiting for the broker lock when it was held.")
+METRICS.counter("broker_job_transitions_total", "Job state changes by the state entered.", ("status",))
+METRICS.gauge("broker_jobs", "Jobs held by the broker by status.", ("status",))
+METRICS.gauge("broker_agent_queue_depth", "Queued jobs waiting for each agent.", ("agent_id",))
+METRICS.gauge("broker_agent_jobs_in_flight", "Jobs dispatched to each agent and not yet reported.", ("agent_id",))
+METRICS.gauge("broker_agent_metrics_age_seconds", "Age of the last metrics push from each agent.", ("agent_id",))
+
+_remote_lock = ContendedLock(METRICS, "broker_lock_wait_seconds")
+# Signalled on every job change so held polls, job waits and event streams can wake up.
+_remote_changed = Condition(_remote_lock)
 _remote_jobs: dict[str, dict] = {}
 _remote_queue_by_agent: dict[str, list[str]] = {}
 _agent_state: dict[str, dict] = {}
+_job_events: deque[tuple[int, dict]] = deque(maxlen=REMOTE_JOB_EVENT_BUFFER)
+_job_event_seq = 0
+# Terminal job ids in finish order, for age and count based eviction.
+_terminal_job_order: OrderedDict[str, float] = OrderedDict()
+_job_store: SqliteJobStore | None = None
+# Monotonic lease deadline per dispatched job.
+_job_lease_deadlines: dict[str, float] = {}
+# job_id -> monotonic marks ("created", "dispatched") for the broker-side spans. Not
+# persisted, so jobs replayed after a restart have no queue_wait.
+_job_clock: dict[str, dict[str, float]] = {}
+# agent_id -> target key ("ip:port:display_id") -> latest swept status of that display.
+_device_status: dict[str, dict[str, dict]] = {}
+_remote_counters: dict[str, int] = {
+    "status_changes_received": 0,
+    "jobs_redelivered": 0,
+    "jobs_dead_lettered": 0,
+    "jobs_evicted_expired": 0,
+    "jobs_evicted_overflow": 0,
+    "results_truncated": 0,
+}
+for _counter_name in _remote_counters:
+    METRICS.counter(f"broker_{_counter_name}_total", f"Broker counter {_counter_name} since start.")
+# agent_id -> (last pushed metrics snapshot, monotonic time received).
+_agent_metrics: dict[str, tuple[dict, float]] = {}
+
+_device_loop: asyncio.AbstractEventLoop | None = None
+_device_loop_lock = Lock()
 
 
 def _utcnow_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _job_snapshot(job: dict) -> dict:
+    """Copy of a job that stays fixed once the lock is released. Caller holds the lock.
+
+    ``spans`` is the only nested value changed in place, so it gets its own copy.
+    """
+    return {**job, "spans": dict(job.get("spans") or {})}
+
+
+def _record_job_event(job: dict) -> None:
+    """Log a job state change and wake every waiter. Caller must hold ``_remote_lock``."""
+    global _job_event_seq
+    _job_event_seq += 1
+    _job_events.append((_job_event_seq, _job_snapshot(job)))
+    METRICS.inc("broker_job_transitions_total", (str(job.get("status")),))
+    if _job_store is not None:
+        _job_store.save(job)
+    _remote_changed.notify_all()
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def _trim_item_results(result, size: int):
+    """Fit a bulk/group result under the cap by dropping per-target ``data``, largest first.
+
+    Items keep their index, address, ``ok`` and ``error``, so every target's outcome
+    survives. Returns None when the result has no item list or bare items still do not fit.
+    """
+    data = result.get("data") if isinstance(result, dict) else None
+    items = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return None
+    trimmed = list(items)
+    by_size = sorted(
+        ((_json_size(item), index) for index, item in enumerate(items) if isinstance(item, dict) and "data" in item),
+        reverse=True,
+    )
+    for item_size, index in by_size:
+        if size <= REMOTE_JOB_MAX_RESULT_BYTES:
+            break
+        bare = {key: value for key, value in items[index].items() if key != "data"}
+        bare["truncated"] = True
+        trimmed[index] = bare
+        size -= item_size - _json_size(bare)
+    bounded = {**result, "data": {**data, "results": trimmed, "truncated": True}}
+    if _json_size(bounded) > REMOTE_JOB_MAX_RESULT_BYTES:
+        return None
+    return bounded
+
+
+def _bounded_result(result):
+    """Bound results to REMOTE_JOB_MAX_RESULT_BYTES.
+
+    Bulk/group results lose per-target data first; anything else that is too large is
+    replaced with a small marker.
+    """
+    if result is None or REMOTE_JOB_MAX_RESULT_BYTES <= 0:
+        return result
+    size = _json_size(result)
+    if size <= REMOTE_JOB_MAX_RESULT_BYTES:
+        return result
+    _remote_counters["results_truncated"] += 1
+    trimmed = _trim_item_results(result, size)
+    if trimmed is not None:
+        return trimmed
+    return {
+        "truncated": True,
+        "size_bytes": size,
+        "limit_bytes": REMOTE_JOB_MAX_RESULT_BYTES,
+    }
+
+
+def _mark_job_terminal(job_id: str) -> None:
+    """Track a finished job for retention; evicts the oldest past the count cap.
+
+    Caller must hold ``_remote_lock``.
+    """
+    _terminal_job_order[job_id] = time.monotonic()
+    _terminal_job_order.move_to_end(job_id)
+    _job_clock.pop(job_id, None)
+    while len(_terminal_job_order) > REMOTE_JOB_MAX_TERMINAL:
+        oldest_id, _finished = _terminal_job_order.popitem(last=False)
+        _remote_jobs.pop(oldest_id, None)
+        if _job_store is not None:
+            _job_store.delete(oldest_id)
+        _remote_counters["jobs_evicted_overflow"] += 1
+
+
+def reap_expired_jobs() -> int:
+    """Drop terminal jobs older than REMOTE_JOB_RETENTION_SECONDS; returns how many."""
+    cutoff = time.monotonic() - REMOTE_JOB_RETENTION_SECONDS
+    evicted = 0
+    with _remote_lock:
+        while _terminal_job_order:
+            job_id, finished = next(iter(_terminal_job_order.items()))
+            if finished > cutoff:
+                break
+            _terminal_job_order.popitem(last=False)
+            _remote_jobs.pop(job_id, None)
+            if _job_store is not None:
+                _job_store.delete(job_id)
+            evicted += 1
+        _remote_counters["jobs_evicted_expired"] += evicted
+    return evicted
+
+
+def restore_jobs(db_path: str) -> int:
+    """Open the durable job store and replay its non-terminal jobs; returns how many.
+
+    Jobs that were dispatched when the broker stopped go back to the queue, since their
+    result can no longer be matched to a live poll.
+    """
+    global _job_store
+    store = SqliteJobStore(db_path)
+    jobs = store.load_pending()
+    with _remote_lock:
+        for job in jobs:
+            if job.get("status") == "dispatched":
+                job["status"] = "queued"
+                job["dispatched_at"] = None
+                job["lease_expires_at"] = None
+                store.save(job)
+            _remote_jobs[job["job_id"]] = job
+            if job.get("status") == "queued":
+                _remote_queue_by_agent.setdefault(job["agent_id"], []).append(job["job_id"])
+        _job_store = store
+    store.start()
+    return len(jobs)
+
+
+def _clamp_lease_seconds(value) -> float:
+    return min(max(float(value), MIN_LEASE_SECONDS), REMOTE_JOB_MAX_LEASE_SECONDS)
+
+
+def _grant_lease(job: dict, lease_s: float) -> None:
+    """Start or extend the visibility timeout of a dispatched job. Caller holds the lock."""
+    _job_lease_deadlines[job["job_id"]] = time.monotonic() + lease_s
+    job["lease_expires_at"] = datetime.fromtimestamp(time.time() + lease_s, timezone.utc).isoformat()
+
+
+def requeue_expired_leases() -> int:
+    """Redeliver dispatched jobs whose lease ran out, or dead-letter them after
+    REMOTE_JOB_MAX_ATTEMPTS. Returns how many jobs changed state."""
+    now = time.monotonic()
+    changed = 0
+    with _remote_lock:
+        expired = [job_id for job_id, deadline in _job_lease_deadlines.items() if deadline <= now]
+        for job_id in expired:
+            _job_lease_deadlines.pop(job_id, None)
+            job = _remote_jobs.get(job_id)
+            if job is None or job.get("status") != "dispatched":
+                continue
+
+            job["lease_expires_at"] = None
+            if int(job.get("attempts") or 0) >= REMOTE_JOB_MAX_ATTEMPTS:
+                job["status"] = "dead_letter"
+                job["finished_at"] = _utcnow_iso()
+                job["error"] = f"Lease expired after {job.get('attempts')} attempts; agent never reported a result."
+                _mark_job_terminal(job_id)
+                _remote_counters["jobs_dead_lettered"] += 1
+            else:
+                job["status"] = "queued"
+                job["dispatched_at"] = None
+                # Front of the queue: this job has already waited once.
+                _remote_queue_by_agent.setdefault(job["agent_id"], []).insert(0, job_id)
+                _remote_counters["jobs_redelivered"] += 1
+            _record_job_event(job)
+            changed += 1
+    return changed
+
+
+def _run_job_maintenance() -> None:
+    last_reap = time.monotonic()
+    while True:
+        time.sleep(LEASE_CHECK_INTERVAL_SECONDS)
+        try:
+            requeue_expired_leases()
+            if time.monotonic() - last_reap >= REMOTE_JOB_REAPER_INTERVAL_SECONDS:
+                last_reap = time.monotonic()
+                reap_expired_jobs()
+        except Exception as exc:
+            print(f"[backend] job maintenance error: {exc}")
+
+
+AGENT_INFO_FIELDS = ("version", "hostname", "local_backend_url", "execution_mode")
+
+
+def _touch_agent(agent_id: str, info: dict | None = None) -> None:
+    """Mark an agent as seen and merge any heartbeat fields it sent. Caller holds the lock."""
+    state = {**_agent_state.get(agent_id, {}), "last_seen": _utcnow_iso()}
+    if isinstance(info, dict):
+        for field in AGENT_INFO_FIELDS:
+            if field in info:
+                state[field] = info.get(field)
+    _agent_state[agent_id] = state
+
+
+def _merge_job_spans(job: dict, reported) -> None:
+    """Store the agent's spans and the broker's dispatch-to-result time. Caller holds the lock."""
+    # A fresh dict, so snapshots taken earlier keep the spans they were taken with.
+    spans = dict(job.get("spans") or {})
+    if isinstance(reported, dict):
+        for stage, value in reported.items():
+            if stage in AGENT_SPAN_STAGES and isinstance(value, (int, float)) and value >= 0:
+                spans[stage] = round(float(value), 1)
+    dispatched = _job_clock.get(job["job_id"], {}).get("dispatched")
+    if dispatched is not None:
+        spans["agent_roundtrip"] = round((time.monotonic() - dispatched) * 1000, 1)
+    job["spans"] = spans
+
+
+def _percentiles(values: list[float]) -> dict:
+    """Nearest-rank percentiles of ``values`` (milliseconds)."""
+    ordered = sorted(values)
+    summary = {"count": len(ordered)}
+    for percentile in TIMING_PERCENTILES:
+        rank = max(1, -(-percentile * len(ordered) // 100))
+        summary[f"p{percentile}"] = ordered[rank - 1]
+    return summary
+
+
+def summarize_job_timing(jobs: list[dict]) -> dict:
+    """p50/p95/p99 per stage over ``jobs``, overall and per agent."""
+    overall: dict[str, list[float]] = {}
+    by_agent: dict[str, dict[str, list[float]]] = {}
+    agent_jobs: dict[str, int] = {}
+    for job in jobs:
+        agent_jobs[job["agent_id"]] = agent_jobs.get(job["agent_id"], 0) + 1
+        agent_stages = by_agent.setdefault(job["agent_id"], {})
+        for stage, value in (job.get("spans") or {}).items():
+            overall.setdefault(stage, []).append(value)
+            agent_stages.setdefault(stage, []).append(value)
+
+    def stages(values_by_stage: dict[str, list[float]]) -> dict:
+        return {
+            stage: _percentiles(values_by_stage[stage])
+            for stage in JOB_SPAN_STAGES
+            if values_by_stage.get(stage)
+        }
+
+    return {
+        "jobs": len(jobs),
+        "stages": stages(overall),
+        "agents": {
+            agent_id: {"jobs": agent_jobs[agent_id], "stages": stages(values)}
+            for agent_id, values in sorted(by_agent.items())
+        },
+    }
+
+
+def _record_job_result(agent_id: str, job_id: str, report: dict) -> tuple[int, dict]:
+    """Apply one agent result report; returns ``(http_status, body)``. Caller holds the lock."""
+    status_text = str(report.get("status", "")).strip().lower()
+    if status_text not in {"success", "error"}:
+        return 400, {"ok": False, "job_id": job_id, "error": "status must be success or error."}
+
+    job = _remote_jobs.get(job_id)
+    if job is None:
+        return 404, {"ok": False, "job_id": job_id, "error": "Job not found."}
+    if job.get("agent_id") != agent_id:
+        return 403, {"ok": False, "job_id": job_id, "error": "Job does not belong to this agent."}
+
+    if job.get("status") in TERMINAL_JOB_STATUSES:
+        # First result wins; a late copy from a redelivered attempt is ignored.
+        return 200, {
+            "ok": True,
+            "status": "duplicate",
+            "job_id": job_id,
+            "job_status": job.get("status"),
+        }
+
+    if job.get("status") == "queued":
+        agent_queue = _remote_queue_by_agent.get(agent_id, [])
+        if job_id in agent_queue:
+            agent_queue.remove(job_id)
+    _job_lease_deadlines.pop(job_id, None)
+    _merge_job_spans(job, report.get("spans"))
+    job["lease_expires_at"] = None
+    job["status"] = "completed" if status_text == "success" else "failed"
+    job["finished_at"] = _utcnow_iso()
+    job["result"] = _bounded_result(report.get("result")) if status_text == "success" else None
+    job["error"] = report.get("error") if status_text == "error" else None
+    _mark_job_terminal(job_id)
+    _record_job_event(job)
+
+    return 200, {
+        "ok": True,
+        "status": "recorded",
+        "job_id": job_id,
+        "job_status": job["status"],
+    }
+
+
+DEVICE_STATUS_FIELDS = ("reachable", "power", "input_source", "mute")
+
+
+def _apply_status_changes(agent_id: str, changes: list, full: bool) -> int:
+    """Merge an agent's swept status deltas into its table. Caller holds the lock.
+
+    A ``full`` report replaces the table, so displays no longer swept drop out.
+    """
+    table = {} if full else _device_status.setdefault(agent_id, {})
+    received_at = _utcnow_iso()
+    applied = 0
+    for change in changes:
+        if not isinstance(change, dict):
+            continue
+        ip = str(change.get("ip", "")).strip()
+        fields = change.get("fields")
+        if not ip or not isinstance(fields, dict):
+            continue
+        port = int(change.get("port", 1515))
+        display_id = int(change.get("display_id", 0))
+        key = f"{ip}:{port}:{display_id}"
+        entry = table.setdefault(
+            key, {"ip": ip, "port": port, "display_id": display_id}
+        )
+        for field in DEVICE_STATUS_FIELDS:
+            if field in fields:
+                entry[field] = fields[field]
+        entry["observed_at"] = change.get("observed_at") or received_at
+        entry["updated_at"] = received_at
+        applied += 1
+    _device_status[agent_id] = table
+    _remote_counters["status_changes_received"] += applied
+    return applied
+
+
+def _collect_broker_metrics(registry) -> None:
+    jobs_by_status: dict[tuple, float] = {}
+    in_flight: dict[tuple, float] = {}
+    with _remote_lock:
+        for job in _remote_jobs.values():
+            job_status = str(job.get("status"))
+            jobs_by_status[(job_status,)] = jobs_by_status.get((job_status,), 0) + 1
+            if job_status == "dispatched":
+                key = (job.get("agent_id"),)
+                in_flight[key] = in_flight.get(key, 0) + 1
+        queue_depth = {(agent_id,): len(queue) for agent_id, queue in _remote_queue_by_agent.items() if queue}
+        counters = dict(_remote_counters)
+    registry.replace("broker_jobs", jobs_by_status)
+    registry.replace("broker_agent_queue_depth", queue_depth)
+    registry.replace("broker_agent_jobs_in_flight", in_flight)
+    for name, value in counters.items():
+        registry.set(f"broker_{name}_total", (), value)
+
+
+METRICS.add_collector(_collect_broker_metrics)
+
+
+def render_broker_metrics() -> str:
+    """This process's metrics plus the latest snapshot each agent pushed, labelled by agent."""
+    now = time.monotonic()
+    agent_sources = []
+    ages: dict[tuple, float] = {}
+    with _remote_lock:
+        for agent_id, (snapshot, received_at) in sorted(_agent_metrics.items()):
+            if now - received_at > AGENT_METRICS_MAX_AGE_SECONDS:
+                continue
+            ages[(agent_id,)] = round(now - received_at, 1)
+            agent_sources.append(({"agent_id": agent_id}, snapshot))
+    METRICS.replace("broker_agent_metrics_age_seconds", ages)
+    return render_metrics([({}, METRICS.snapshot())] + agent_sources)
+
+
+def _parse_id_filter(values: list[str]) -> set[str]:
+    ids: set[str] = set()
+    for value in values:
+        ids.update(item.strip() for item in value.split(",") if item.strip())
+    return ids
+
+
+def _get_device_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop that runs every device action.
+
+    One long-lived loop lets pooled MDC sessions and in-flight tasks outlive a request.
+    """
+    global _device_loop
+    with _device_loop_lock:
+        if _device_loop is None:
+            loop = asyncio.new_event_loop()
+            Thread(target=loop.run_forever, name="device-loop", daemon=True).start()
+            _device_loop = loop
+        return _device_loop
+
+
+def _run_device_coroutine(coro):
+    return asyncio.run_coroutine_threadsafe(coro, _get_device_loop()).result()
+
+
 def _probe_tcp(ip: str, port: int, timeout: float = 0.8) -> bool:
     try:
         with socket.create_connection((ip, port), timeout=timeout):
@@ -60,17 +534,37 @@ def auto_probe(ip: str) -> dict:
     }
 
 
+# Query keys redacted from the access log; event streams and scrapers pass the API key this way.
+_SECRET_QUERY_PATTERN = re.compile(r"((?:^|[?&])api_key=)[^&\s\"]*")
+
+
 class Handler(BaseHTTPRequestHandler):
+    # Keep-alive lets agents and the UI reuse one connection for polls and results.
+    protocol_version = "HTTP/1.1"
+    timeout = HTTP_KEEPALIVE_TIMEOUT_SECONDS
+
+    def parse_request(self) -> bool:
+        self._body_read = False
+        return super().parse_request()
+
+    def log_message(self, format, *args) -> None:
+        super().log_message("%s", _SECRET_QUERY_PATTERN.sub(r"\1[redacted]", format % args))
+
     def _read_json(self) -> dict:
         length = int(self.headers.get("Content-Length", "0"))
-        body = self.rfile.read(length).decode("utf-8") if length > 0 else "{}"
+        raw = self.rfile.read(length) if length > 0 else b""
+        self._body_read = True
+        if raw and self.headers.get("Content-Encoding", "").strip().lower() == "gzip":
+            raw = gzip.decompress(raw)
+        body = raw.decode("utf-8") if raw else "{}"
         payload = json.loads(body)
         if not isinstance(payload, dict):
             raise ValueError("JSON payload must be an object")
         return payload
 
-    def _assert_cloud_api_key(self) -> tuple[bool, int, str]:
-        provided = self.headers.get("x-api-key")
+    def _assert_cloud_api_key(self, query_key: str | None = None) -> tuple[bool, int, str]:
+        # EventSource cannot send headers, so event streams may pass the key as a query value.
+        provided = self.headers.get("x-api-key") or query_key
         if REMOTE_AUTH_REQUIRED and not CLOUD_API_KEY:
             return (
                 False,
@@ -93,17 +587,182 @@ class Handler(BaseHTTPRequestHandler):
             return (False, 401, "Invalid agent token.")
         return (True, 200, "ok")
 
+    def _send_cors_headers(self) -> None:
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, x-api-key, x-agent-token")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+
     def _send_json(self, status: int, payload: dict) -> None:
         data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(data)))
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type, x-api-key, x-agent-token")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        if not self._body_read and int(self.headers.get("Content-Length") or 0) > 0:
+            # An unread request body would be parsed as the next request on this connection.
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self._send_cors_headers()
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, status: int, text: str, content_type: str) -> None:
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self._send_cors_headers()
         self.end_headers()
         self.wfile.write(data)
 
+    def _start_stream(self, content_type: str) -> None:
+        # No Content-Length: the body ends when the connection closes.
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self._send_cors_headers()
+        self.end_headers()
+        self.close_connection = True
+
+    def _write_ndjson_line(self, payload: dict) -> None:
+        self.wfile.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def _write_sse(self, event: str, payload: dict, event_id: int | None = None) -> None:
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(payload, ensure_ascii=False)}")
+        self.wfile.write(("\n".join(lines) + "\n\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def _stream_job_events(self, agent_ids: set[str], job_ids: set[str]) -> None:
+        """Server-Sent Events of job state changes, optionally filtered by agent or job ids."""
+
+        def matches(job: dict) -> bool:
+            if agent_ids and job.get("agent_id") not in agent_ids:
+                return False
+            if job_ids and job.get("job_id") not in job_ids:
+                return False
+            return True
+
+        with _remote_lock:
+            cursor = _job_event_seq
+            # Replay the current state of explicitly requested jobs so none is missed.
+            initial = [_job_snapshot(_remote_jobs[job_id]) for job_id in sorted(job_ids) if job_id in _remote_jobs]
+
+        self._start_stream("text/event-stream; charset=utf-8")
+        try:
+            for job in initial:
+                if matches(job):
+                    self._write_sse("job", job, cursor)
+
+            last_write = time.monotonic()
+            while True:
+                with _remote_changed:
+                    if not _job_events or _job_events[-1][0] <= cursor:
+                        _remote_changed.wait(JOB_EVENTS_KEEPALIVE_SECONDS)
+                    pending = [(seq, job) for seq, job in _job_events if seq > cursor]
+
+                for seq, job in pending:
+                    cursor = seq
+                    if matches(job):
+                        self._write_sse("job", job, seq)
+                        last_write = time.monotonic()
+
+                if time.monotonic() - last_write >= JOB_EVENTS_KEEPALIVE_SECONDS:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    last_write = time.monotonic()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _pump_device_items(self, items) -> tuple:
+        """Drain async iterator ``items`` on the device loop into a queue ended by None."""
+        results: queue.Queue = queue.Queue()
+
+        async def pump() -> None:
+            try:
+                async for item in items:
+                    results.put(item)
+            finally:
+                results.put(None)
+
+        return asyncio.run_coroutine_threadsafe(pump(), _get_device_loop()), results
+
+    def _stream_discovery(self) -> None:
+        try:
+            request = parse_discovery_request(self._read_json())
+        except Exception as exc:
+            self._send_json(400, {"ok": False, "error": str(exc)})
+            return
+
+        started = time.perf_counter()
+        future, results = self._pump_device_items(iter_discovery(request))
+        self._start_stream("application/x-ndjson; charset=utf-8")
+
+        found = confirmed = 0
+        try:
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+                found += 1
+                if item.get("mdc"):
+                    confirmed += 1
+                self._write_ndjson_line(item)
+
+            self._write_ndjson_line(
+                {
+                    "done": True,
+                    "scanned": len(request["ips"]),
+                    "found": found,
+                    "confirmed": confirmed,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                }
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            future.cancel()
+
+    def _stream_bulk_device_actions(self) -> None:
+        try:
+            payload = self._read_json()
+            action, target_payloads, concurrency = parse_bulk_request(payload)
+        except Exception as exc:
+            self._send_json(400, {"ok": False, "error": str(exc)})
+            return
+
+        started = time.perf_counter()
+        future, results = self._pump_device_items(iter_bulk_actions(action, target_payloads, concurrency))
+        self._start_stream("application/x-ndjson; charset=utf-8")
+
+        succeeded = failed = 0
+        try:
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+                if item.get("ok"):
+                    succeeded += 1
+                else:
+                    failed += 1
+                self._write_ndjson_line(item)
+
+            self._write_ndjson_line(
+                {
+                    "done": True,
+                    "action": action,
+                    "total": len(target_payloads),
+                    "succeeded": succeeded,
+                    "failed": failed,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                }
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; stop the remaining device work.
+            future.cancel()
+
     def do_OPTIONS(self):
         self._send_json(200, {"ok": True})
 
@@ -121,6 +780,65 @@ class Handler(BaseHTTPRequestHandler):
             self._send_json(200, result)
             return
 
+        if parsed.path == "/device_health":
+            # Read on the device loop, which owns the breaker and latency state.
+            result = _run_device_coroutine(main_async("device_health", {}))
+            self._send_json(200, result)
+            return
+
+        if parsed.path == "/metrics":
+            # Scrapers that cannot set headers may pass the key as ?api_key=.
+            query = parse_qs(parsed.query)
+            ok, status, detail = self._assert_cloud_api_key((query.get("api_key") or [None])[0])
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+            self._send_text(200, render_broker_metrics(), "text/plain; version=0.0.4; charset=utf-8")
+            return
+
+        if parsed.path == "/api/remote/stats":
+            ok, status, detail = self._assert_cloud_api_key()
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+
+            with _remote_lock:
+                jobs_by_status: dict[str, int] = {}
+                for job in _remote_jobs.values():
+                    job_status = str(job.get("status"))
+                    jobs_by_status[job_status] = jobs_by_status.get(job_status, 0) + 1
+                stats = {
+                    "jobs_total": len(_remote_jobs),
+                    "jobs_by_status": jobs_by_status,
+                    "terminal_retained": len(_terminal_job_order),
+                    "queue_depth": sum(len(queue) for queue in _remote_queue_by_agent.values()),
+                    **_remote_counters,
+                }
+
+            self._send_json(200, {"ok": True, **stats})
+            return
+
+        if parsed.path == "/api/remote/timing":
+            ok, status, detail = self._assert_cloud_api_key()
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+
+            query = parse_qs(parsed.query)
+            agent_ids = _parse_id_filter(query.get("agent_id", []))
+            kinds = _parse_id_filter(query.get("kind", []))
+            with _remote_lock:
+                jobs = [
+                    {"agent_id": job["agent_id"], "spans": dict(job["spans"])}
+                    for job in _remote_jobs.values()
+                    if job.get("status") in TERMINAL_JOB_STATUSES
+                    and job.get("spans")
+                    and (not agent_ids or job["agent_id"] in agent_ids)
+                    and (not kinds or job.get("kind") in kinds)
+                ]
+            self._send_json(200, {"ok": True, **summarize_job_timing(jobs)})
+            return
+
         if parsed.path == "/api/remote/agents":
             ok, status, detail = self._assert_cloud_api_key()
             if not ok:
@@ -138,6 +856,7 @@ class Handler(BaseHTTPRequestHandler):
                             "version": info.get("version"),
                             "hostname": info.get("hostname"),
                             "local_backend_url": info.get("local_backend_url"),
+                            "execution_mode": info.get("execution_mode"),
                             "queue_depth": queue_depth,
                         }
                     )
@@ -145,6 +864,42 @@ class Handler(BaseHTTPRequestHandler):
             self._send_json(200, {"ok": True, "agents": agents})
             return
 
+        if parsed.path == "/api/remote/device_status":
+            ok, status, detail = self._assert_cloud_api_key()
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+
+            query = parse_qs(parsed.query)
+            agent_ids = _parse_id_filter(query.get("agent_id", []))
+            # ISO timestamps compare correctly as strings.
+            updated_since = (query.get("updated_since") or [""])[0].strip()
+            devices = []
+            with _remote_lock:
+                for agent_id in sorted(_device_status):
+                    if agent_ids and agent_id not in agent_ids:
+                        continue
+                    for entry in _device_status[agent_id].values():
+                        if updated_since and entry.get("updated_at", "") <= updated_since:
+                            continue
+                        devices.append({"agent_id": agent_id, **entry})
+
+            self._send_json(200, {"ok": True, "devices": devices, "server_time": _utcnow_iso()})
+            return
+
+        if parsed.path == "/api/remote/jobs/events":
+            query = parse_qs(parsed.query)
+            ok, status, detail = self._assert_cloud_api_key((query.get("api_key") or [None])[0])
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+
+            self._stream_job_events(
+                agent_ids=_parse_id_filter(query.get("agent_id", [])),
+                job_ids=_parse_id_filter(query.get("job_id", [])),
+            )
+            return
+
         if parsed.path.startswith("/api/remote/jobs/"):
             ok, status, detail = self._assert_cloud_api_key()
             if not ok:
@@ -156,8 +911,25 @@ class Handler(BaseHTTPRequestHandler):
                 self._send_json(400, {"ok": False, "error": "Invalid job_id."})
                 return
 
-            with _remote_lock:
+            query = parse_qs(parsed.query)
+            try:
+                wait_s = float((query.get("wait") or ["0"])[0] or 0)
+            except ValueError:
+                self._send_json(400, {"ok": False, "error": "wait must be a number of seconds."})
+                return
+            wait_s = min(max(wait_s, 0.0), REMOTE_JOB_MAX_WAIT_SECONDS)
+            deadline = time.monotonic() + wait_s
+
+            with _remote_changed:
                 job = _remote_jobs.get(job_id)
+                # Blocking read: hold until the job is terminal or wait runs out.
+                while job is not None and job.get("status") not in TERMINAL_JOB_STATUSES:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    _remote_changed.wait(remaining)
+                    job = _remote_jobs.get(job_id)
+                job = _job_snapshot(job) if job is not None else None
 
             if job is None:
                 self._send_json(404, {"ok": False, "error": "Job not found."})
@@ -191,11 +963,15 @@ class Handler(BaseHTTPRequestHandler):
                 if not isinstance(job_payload, dict):
                     self._send_json(400, {"ok": False, "error": "payload must be an object."})
                     return
+                lease_s = _clamp_lease_seconds(payload.get("lease_s") or REMOTE_JOB_LEASE_SECONDS)
+                # Callers may pass their own trace id to follow one request across systems.
+                trace_id = str(payload.get("trace_id") or "").strip()[:64] or uuid4().hex
 
                 job_id = str(uuid4())
                 created_at = _utcnow_iso()
                 job = {
                     "job_id": job_id,
+                    "trace_id": trace_id,
                     "agent_id": agent_id,
                     "kind": kind,
                     "payload": job_payload,
@@ -205,11 +981,17 @@ class Handler(BaseHTTPRequestHandler):
                     "finished_at": None,
                     "result": None,
                     "error": None,
+                    "attempts": 0,
+                    "lease_s": lease_s,
+                    "lease_expires_at": None,
+                    "spans": {},
                 }
 
                 with _remote_lock:
                     _remote_jobs[job_id] = job
+                    _job_clock[job_id] = {"created": time.monotonic()}
                     _remote_queue_by_agent.setdefault(agent_id, []).append(job_id)
+                    _record_job_event(job)
 
                 self._send_json(
                     200,
@@ -217,6 +999,7 @@ class Handler(BaseHTTPRequestHandler):
                         "ok": True,
                         "status": "queued",
                         "job_id": job_id,
+                        "trace_id": trace_id,
                         "agent_id": agent_id,
                         "kind": kind,
                         "created_at": created_at,
@@ -245,12 +1028,7 @@ class Handler(BaseHTTPRequestHandler):
 
                 payload = self._read_json()
                 with _remote_lock:
-                    _agent_state[agent_id] = {
-                        "last_seen": _utcnow_iso(),
-                        "version": payload.get("version"),
-                        "hostname": payload.get("hostname"),
-                        "local_backend_url": payload.get("local_backend_url"),
-                    }
+                    _touch_agent(agent_id, payload)
 
                 self._send_json(200, {"ok": True, "status": "ok", "agent_id": agent_id})
                 return
@@ -280,9 +1058,21 @@ class Handler(BaseHTTPRequestHandler):
                     max_jobs = 1
                 if max_jobs > 50:
                     max_jobs = 50
+                wait_s = float(payload.get("wait_s", 0) or 0)
+                wait_s = min(max(wait_s, 0.0), REMOTE_POLL_MAX_WAIT_SECONDS)
+                deadline = time.monotonic() + wait_s
 
                 jobs = []
-                with _remote_lock:
+                with _remote_changed:
+                    # Heartbeat fields may ride along with the poll.
+                    _touch_agent(agent_id, payload.get("agent"))
+                    # Long poll: hold the request until work arrives or wait_s runs out.
+                    while not _remote_queue_by_agent.get(agent_id):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        _remote_changed.wait(remaining)
+
                     queue = _remote_queue_by_agent.get(agent_id, [])
                     take = min(max_jobs, len(queue))
                     job_ids = queue[:take]
@@ -297,12 +1087,20 @@ class Handler(BaseHTTPRequestHandler):
                             continue
                         job["status"] = "dispatched"
                         job["dispatched_at"] = _utcnow_iso()
-                        jobs.append(job)
-
-                    _agent_state[agent_id] = {
-                        **_agent_state.get(agent_id, {}),
-                        "last_seen": _utcnow_iso(),
-                    }
+                        job["attempts"] = int(job.get("attempts") or 0) + 1
+                        clock = _job_clock.get(job_id)
+                        if clock is not None:
+                            # From enqueue, so a redelivered job includes its earlier attempts.
+                            clock["dispatched"] = time.monotonic()
+                            job["spans"] = {
+                                **(job.get("spans") or {}),
+                                "queue_wait": round((clock["dispatched"] - clock["created"]) * 1000, 1),
+                            }
+                        _grant_lease(job, float(job.get("lease_s") or REMOTE_JOB_LEASE_SECONDS))
+                        _record_job_event(job)
+                        jobs.append(_job_snapshot(job))
+
+                    _touch_agent(agent_id)
 
                 self._send_json(200, {"ok": True, "agent_id": agent_id, "jobs": jobs})
                 return
@@ -310,7 +1108,111 @@ class Handler(BaseHTTPRequestHandler):
                 self._send_json(400, {"ok": False, "error": str(exc)})
                 return
 
-        if parsed.path.startswith("/api/agent/") and "/jobs/" in parsed.path and parsed.path.endswith("/result"):
+        if parsed.path.startswith("/api/agent/") and parsed.path.endswith("/status"):
+            ok, status, detail = self._assert_agent_token()
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+
+            try:
+                parts = parsed.path.strip("/").split("/")
+                if len(parts) != 4 or parts[0] != "api" or parts[1] != "agent" or parts[3] != "status":
+                    self._send_json(404, {"ok": False, "error": "Not found"})
+                    return
+                agent_id = parts[2].strip()
+                if not agent_id:
+                    self._send_json(400, {"ok": False, "error": "Invalid agent_id."})
+                    return
+
+                payload = self._read_json()
+                changes = payload.get("changes")
+                if not isinstance(changes, list):
+                    self._send_json(400, {"ok": False, "error": "changes must be an array."})
+                    return
+                full = bool(payload.get("full"))
+
+                with _remote_lock:
+                    # Deltas are meaningless without the table they apply to (broker restart);
+                    # ask the agent for a full report instead.
+                    resync = not full and agent_id not in _device_status
+                    applied = 0 if resync else _apply_status_changes(agent_id, changes, full)
+                    _touch_agent(agent_id, payload.get("agent"))
+
+                self._send_json(200, {"ok": True, "applied": applied, "resync": resync})
+                return
+            except Exception as exc:
+                self._send_json(400, {"ok": False, "error": str(exc)})
+                return
+
+        if parsed.path.startswith("/api/agent/") and parsed.path.endswith("/metrics"):
+            ok, status, detail = self._assert_agent_token()
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+
+            try:
+                parts = parsed.path.strip("/").split("/")
+                if len(parts) != 4 or parts[0] != "api" or parts[1] != "agent" or parts[3] != "metrics":
+                    self._send_json(404, {"ok": False, "error": "Not found"})
+                    return
+                agent_id = parts[2].strip()
+                if not agent_id:
+                    self._send_json(400, {"ok": False, "error": "Invalid agent_id."})
+                    return
+
+                payload = self._read_json()
+                snapshot = validate_snapshot(payload.get("metrics"))
+
+                with _remote_lock:
+                    _agent_metrics[agent_id] = (snapshot, time.monotonic())
+                    _touch_agent(agent_id, payload.get("agent"))
+
+                self._send_json(200, {"ok": True})
+                return
+            except Exception as exc:
+                self._send_json(400, {"ok": False, "error": str(exc)})
+                return
+
+        if parsed.path.startswith("/api/agent/") and parsed.path.endswith("/results"):
+            ok, status, detail = self._assert_agent_token()
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+
+            try:
+                parts = parsed.path.strip("/").split("/")
+                if len(parts) != 4 or parts[0] != "api" or parts[1] != "agent" or parts[3] != "results":
+                    self._send_json(404, {"ok": False, "error": "Not found"})
+                    return
+                agent_id = parts[2].strip()
+                if not agent_id:
+                    self._send_json(400, {"ok": False, "error": "Invalid agent_id."})
+                    return
+
+                payload = self._read_json()
+                reports = payload.get("results")
+                if not isinstance(reports, list):
+                    self._send_json(400, {"ok": False, "error": "results must be an array."})
+                    return
+
+                recorded = []
+                with _remote_lock:
+                    for report in reports:
+                        if not isinstance(report, dict):
+                            recorded.append({"ok": False, "error": "result must be an object."})
+                            continue
+                        job_id = str(report.get("job_id", "")).strip()
+                        _status, body = _record_job_result(agent_id, job_id, report)
+                        recorded.append(body)
+                    _touch_agent(agent_id, payload.get("agent"))
+
+                self._send_json(200, {"ok": True, "agent_id": agent_id, "results": recorded})
+                return
+            except Exception as exc:
+                self._send_json(400, {"ok": False, "error": str(exc)})
+                return
+
+        if parsed.path.startswith("/api/agent/") and "/jobs/" in parsed.path and parsed.path.endswith("/lease"):
             ok, status, detail = self._assert_agent_token()
             if not ok:
                 self._send_json(status, {"ok": False, "error": detail})
@@ -323,60 +1225,92 @@ class Handler(BaseHTTPRequestHandler):
                     or parts[0] != "api"
                     or parts[1] != "agent"
                     or parts[3] != "jobs"
-                    or parts[5] != "result"
+                    or parts[5] != "lease"
                 ):
                     self._send_json(404, {"ok": False, "error": "Not found"})
                     return
 
                 agent_id = parts[2].strip()
                 job_id = parts[4].strip()
-                if not agent_id:
-                    self._send_json(400, {"ok": False, "error": "Invalid agent_id."})
-                    return
-                if not job_id:
-                    self._send_json(400, {"ok": False, "error": "Invalid job_id."})
-                    return
-
                 payload = self._read_json()
-                status_text = str(payload.get("status", "")).strip().lower()
-                if status_text not in {"success", "error"}:
-                    self._send_json(400, {"ok": False, "error": "status must be success or error."})
-                    return
 
                 with _remote_lock:
                     job = _remote_jobs.get(job_id)
                     if job is None:
                         self._send_json(404, {"ok": False, "error": "Job not found."})
                         return
-
                     if job.get("agent_id") != agent_id:
                         self._send_json(403, {"ok": False, "error": "Job does not belong to this agent."})
                         return
+                    if job.get("status") != "dispatched":
+                        self._send_json(
+                            409,
+                            {"ok": False, "error": f"Job is {job.get('status')}, not dispatched."},
+                        )
+                        return
 
-                    job["status"] = "completed" if status_text == "success" else "failed"
-                    job["finished_at"] = _utcnow_iso()
-                    job["result"] = payload.get("result") if status_text == "success" else None
-                    job["error"] = payload.get("error") if status_text == "error" else None
-
-                    _agent_state[agent_id] = {
-                        **_agent_state.get(agent_id, {}),
-                        "last_seen": _utcnow_iso(),
-                    }
+                    lease_s = _clamp_lease_seconds(
+                        payload.get("extend_s") or job.get("lease_s") or REMOTE_JOB_LEASE_SECONDS
+                    )
+                    _grant_lease(job, lease_s)
+                    lease_expires_at = job["lease_expires_at"]
 
                 self._send_json(
                     200,
-                    {
-                        "ok": True,
-                        "status": "recorded",
-                        "job_id": job_id,
-                        "job_status": "completed" if status_text == "success" else "failed",
-                    },
+                    {"ok": True, "job_id": job_id, "lease_expires_at": lease_expires_at},
                 )
                 return
             except Exception as exc:
                 self._send_json(400, {"ok": False, "error": str(exc)})
                 return
 
+        if parsed.path.startswith("/api/agent/") and "/jobs/" in parsed.path and parsed.path.endswith("/result"):
+            ok, status, detail = self._assert_agent_token()
+            if not ok:
+                self._send_json(status, {"ok": False, "error": detail})
+                return
+
+            try:
+                parts = parsed.path.strip("/").split("/")
+                if (
+                    len(parts) != 6
+                    or parts[0] != "api"
+                    or parts[1] != "agent"
+                    or parts[3] != "jobs"
+                    or parts[5] != "result"
+                ):
+                    self._send_json(404, {"ok": False, "error": "Not found"})
+                    return
+
+                agent_id = parts[2].strip()
+                job_id = parts[4].strip()
+                if not agent_id:
+                    self._send_json(400, {"ok": False, "error": "Invalid agent_id."})
+                    return
+                if not job_id:
+                    self._send_json(400, {"ok": False, "error": "Invalid job_id."})
+                    return
+
+                payload = self._read_json()
+                with _remote_lock:
+                    status, body = _record_job_result(agent_id, job_id, payload)
+                    if status == 200:
+                        _touch_agent(agent_id, payload.get("agent"))
+
+                self._send_json(status, body)
+                return
+            except Exception as exc:
+                self._send_json(400, {"ok": False, "error": str(exc)})
+                return
+
+        if parsed.path == "/discover":
+            self._stream_discovery()
+            return
+
+        if parsed.path == "/device_actions/bulk":
+            self._stream_bulk_device_actions()
+            return
+
         if parsed.path != "/device_action":
             self._send_json(404, {"ok": False, "error": "Not found"})
             return
@@ -393,16 +1327,34 @@ class Handler(BaseHTTPRequestHandler):
                 self._send_json(400, {"ok": False, "error": "payload must be an object"})
                 return
 
-            result = asyncio.run(main_async(action, action_payload))
+            result = _run_device_coroutine(main_async(action, action_payload))
             self._send_json(200, result)
         except Exception as exc:
             self._send_json(500, {"ok": False, "error": str(exc)})
 
 
 def main():
+    if REMOTE_JOB_DB_PATH:
+        restored = restore_jobs(REMOTE_JOB_DB_PATH)
+        print(f"Restored {restored} pending remote jobs from {REMOTE_JOB_DB_PATH}")
+    _get_device_loop()
+    Thread(target=_run_job_maintenance, name="job-maintenance", daemon=True).start()
     server = ThreadingHTTPServer((HOST, PORT), Handler)
     print(f"Samsung web backend listening on http://{HOST}:{PORT}")
-    server.serve_forever()
+    # Turn SIGTERM into a normal exit so the job journal is flushed below.
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if _job_store is not None:
+            _job_store.close()
+
+
+def _exit_on_signal(signum, _frame) -> None:
+    raise SystemExit(128 + signum)
 
 
 if __name__ == "__main__":
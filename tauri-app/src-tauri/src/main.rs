@@ -2,11 +2,16 @@
 
 use serde::{Deserialize, Serialize};
 use serde_json::Value;
+use std::collections::HashMap;
 use std::fs;
+use std::io::{BufRead, BufReader, Write};
 use std::net::{SocketAddr, TcpStream};
 use std::path::PathBuf;
-use std::process::Command;
-use std::time::Duration;
+use std::process::{Child, ChildStdin, Command, Stdio};
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
 
 #[cfg(windows)]
 use std::os::windows::process::CommandExt;
@@ -16,6 +21,17 @@ const CREATE_NO_WINDOW: u32 = 0x0800_0000;
 
 const BRIDGE_PATH: &str = concat!(env!("CARGO_MANIFEST_DIR"), "/../py/bridge.py");
 const BRIDGE_SOURCE: &str = include_str!(concat!(env!("CARGO_MANIFEST_DIR"), "/../py/bridge.py"));
+// Single-device actions; the bridge itself gives up on one action after 60s.
+const BRIDGE_DAEMON_RESPONSE_TIMEOUT: Duration = Duration::from_secs(90);
+const BRIDGE_DAEMON_MAX_RESPONSE_TIMEOUT: Duration = Duration::from_secs(30 * 60);
+// Mirrors bridge.py: MAX_TIMEOUT_SECONDS, BULK_MAX_CONCURRENCY, DISCOVERY_CONCURRENCY.
+const BRIDGE_ACTION_MAX_SECS: u64 = 60;
+const BRIDGE_BULK_CONCURRENCY: u64 = 32;
+const BRIDGE_DISCOVERY_CONCURRENCY: u64 = 256;
+// Probe plus a model/serial read at the longest response limit.
+const BRIDGE_DISCOVERY_HOST_SECS: u64 = 12;
+const BRIDGE_DAEMON_RETRY_MIN: Duration = Duration::from_secs(5);
+const BRIDGE_DAEMON_RETRY_MAX: Duration = Duration::from_secs(300);
 
 fn bridge_binary_candidates() -> Vec<PathBuf> {
     let mut candidates = Vec::new();
@@ -470,9 +486,313 @@ fn run_bridge(action: &str, payload: &Value) -> Result<Value, String> {
     Err(last_error)
 }
 
-#[tauri::command]
+type PendingBridgeRequests = Arc<Mutex<HashMap<u64, mpsc::Sender<Value>>>>;
+
+struct BridgeDaemon {
+    child: Child,
+    stdin: ChildStdin,
+    pending: PendingBridgeRequests,
+    alive: Arc<AtomicBool>,
+}
+
+enum BridgeDaemonError {
+    // The request never reached the daemon, so it is safe to retry with a one-shot bridge.
+    Unavailable(String),
+    // The request was sent; retrying could repeat a setter on the display.
+    Failed(String),
+}
+
+struct BridgeDaemonSlot {
+    daemon: Option<BridgeDaemon>,
+    // After a failed spawn, calls go straight to the one-shot bridge until this time.
+    retry_at: Option<Instant>,
+    retry_backoff: Duration,
+    spawn_error: String,
+}
+
+static BRIDGE_DAEMON: Mutex<BridgeDaemonSlot> = Mutex::new(BridgeDaemonSlot {
+    daemon: None,
+    retry_at: None,
+    retry_backoff: Duration::ZERO,
+    spawn_error: String::new(),
+});
+static NEXT_BRIDGE_REQUEST_ID: AtomicU64 = AtomicU64::new(1);
+
+fn bridge_daemon_command() -> Result<Command, String> {
+    let bridge_binary = bridge_binary_candidates()
+        .into_iter()
+        .find(|path| path.exists() && path.is_file());
+
+    if let Some(bridge_exe) = bridge_binary {
+        let mut command = Command::new(&bridge_exe);
+        apply_no_window(&mut command);
+        command.arg("--serve");
+        return Ok(command);
+    }
+
+    let bridge_path = match bridge_script_candidates().into_iter().find(|path| path.exists()) {
+        Some(path) => path,
+        None => ensure_embedded_bridge_file()?,
+    };
+
+    let launcher = python_launchers()
+        .into_iter()
+        .find(|launcher| matches!(launcher_has_required_modules(*launcher), Ok(true)))
+        .ok_or_else(|| "No Python launcher with samsung_mdc available for bridge daemon".to_string())?;
+
+    let mut command = launcher_command(launcher);
+    command.arg(&bridge_path).arg("--serve");
+    Ok(command)
+}
+
+fn spawn_bridge_daemon(mut command: Command) -> Result<BridgeDaemon, String> {
+    let mut child = command
+        .stdin(Stdio::piped())
+        .stdout(Stdio::piped())
+        .stderr(Stdio::null())
+        .spawn()
+        .map_err(|e| format!("Unable to start bridge daemon: {e}"))?;
+
+    let stdin = child
+        .stdin
+        .take()
+        .ok_or_else(|| "Bridge daemon stdin unavailable".to_string())?;
+    let stdout = child
+        .stdout
+        .take()
+        .ok_or_else(|| "Bridge daemon stdout unavailable".to_string())?;
+
+    let pending: PendingBridgeRequests = Arc::new(Mutex::new(HashMap::new()));
+    let alive = Arc::new(AtomicBool::new(true));
+    let reader_pending = Arc::clone(&pending);
+    let reader_alive = Arc::clone(&alive);
+
+    thread::spawn(move || {
+        let reader = BufReader::new(stdout);
+        for line in reader.lines() {
+            let Ok(line) = line else {
+                break;
+            };
+            let Ok(mut message) = serde_json::from_str::<Value>(&line) else {
+                continue;
+            };
+            let Some(request_id) = message.get("id").and_then(Value::as_u64) else {
+                continue;
+            };
+            if let Some(object) = message.as_object_mut() {
+                object.remove("id");
+            }
+            let sender = reader_pending
+                .lock()
+                .ok()
+                .and_then(|mut pending| pending.remove(&request_id));
+            if let Some(sender) = sender {
+                let _ = sender.send(message);
+            }
+        }
+
+        reader_alive.store(false, Ordering::SeqCst);
+        if let Ok(mut pending) = reader_pending.lock() {
+            // Dropping the senders wakes every waiter with a disconnect error.
+            pending.clear();
+        }
+    });
+
+    Ok(BridgeDaemon {
+        child,
+        stdin,
+        pending,
+        alive,
+    })
+}
+
+fn waves(items: u64, concurrency: u64) -> u64 {
+    let concurrency = concurrency.max(1);
+    (items + concurrency - 1) / concurrency
+}
+
+fn bulk_response_secs(payload: &Value) -> u64 {
+    let targets = payload
+        .get("targets")
+        .and_then(Value::as_array)
+        .cloned()
+        .unwrap_or_default();
+    let concurrency = payload
+        .get("concurrency")
+        .and_then(Value::as_u64)
+        .unwrap_or(BRIDGE_BULK_CONCURRENCY)
+        .min(BRIDGE_BULK_CONCURRENCY);
+    // Targets on one ip:port run one after another, whatever the concurrency.
+    let mut per_host: HashMap<String, u64> = HashMap::new();
+    for target in &targets {
+        let ip = target
+            .get("ip")
+            .or_else(|| target.get("tv_ip"))
+            .map(Value::to_string)
+            .unwrap_or_default();
+        let port = target.get("port").map(Value::to_string).unwrap_or_default();
+        *per_host.entry(format!("{ip}:{port}")).or_insert(0) += 1;
+    }
+    let busiest_host = per_host.values().copied().max().unwrap_or(0);
+    let rounds = waves(targets.len() as u64, concurrency).max(busiest_host);
+    rounds * BRIDGE_ACTION_MAX_SECS
+}
+
+fn discovery_response_secs(payload: &Value) -> u64 {
+    let cidrs = match payload.get("cidr") {
+        Some(Value::String(cidr)) => vec![cidr.clone()],
+        Some(Value::Array(items)) => items
+            .iter()
+            .filter_map(|item| item.as_str().map(str::to_string))
+            .collect(),
+        _ => Vec::new(),
+    };
+    let mut hosts: u64 = payload
+        .get("ips")
+        .and_then(Value::as_array)
+        .map_or(0, |ips| ips.len() as u64);
+    for cidr in cidrs {
+        let prefix = cidr
+            .split('/')
+            .nth(1)
+            .and_then(|bits| bits.trim().parse::<u32>().ok())
+            .unwrap_or(32)
+            .min(32);
+        hosts += 1u64 << (32 - prefix).min(12);
+    }
+    let concurrency = payload
+        .get("concurrency")
+        .and_then(Value::as_u64)
+        .unwrap_or(BRIDGE_DISCOVERY_CONCURRENCY)
+        .min(BRIDGE_DISCOVERY_CONCURRENCY);
+    waves(hosts, concurrency) * BRIDGE_DISCOVERY_HOST_SECS
+}
+
+// How long to wait for the daemon's answer; bulk and discovery scale with their size.
+fn bridge_response_timeout(action: &str, payload: &Value) -> Duration {
+    let secs = match action {
+        "bulk" => bulk_response_secs(payload),
+        "discover" => discovery_response_secs(payload),
+        _ => return BRIDGE_DAEMON_RESPONSE_TIMEOUT,
+    };
+    (Duration::from_secs(secs) + Duration::from_secs(30))
+        .clamp(BRIDGE_DAEMON_RESPONSE_TIMEOUT, BRIDGE_DAEMON_MAX_RESPONSE_TIMEOUT)
+}
+
+fn run_bridge_daemon(action: &str, payload: &Value) -> Result<Value, BridgeDaemonError> {
+    let request_id = NEXT_BRIDGE_REQUEST_ID.fetch_add(1, Ordering::SeqCst);
+    let line = serde_json::json!({
+        "id": request_id,
+        "action": action,
+        "payload": payload,
+    })
+    .to_string();
+    let (sender, receiver) = mpsc::channel();
+
+    // Finding the launcher runs Python probes, so it happens without holding the lock;
+    // the slot is checked again afterwards in case another call started the daemon.
+    let mut prepared: Option<Result<Command, String>> = None;
+    let (pending, alive) = loop {
+        let mut slot = BRIDGE_DAEMON
+            .lock()
+            .map_err(|_| BridgeDaemonError::Unavailable("Bridge daemon lock poisoned".to_string()))?;
+
+        let needs_spawn = match slot.daemon.as_mut() {
+            Some(daemon) => {
+                !daemon.alive.load(Ordering::SeqCst) || matches!(daemon.child.try_wait(), Ok(Some(_)))
+            }
+            None => true,
+        };
+        if needs_spawn {
+            if let Some(mut stale) = slot.daemon.take() {
+                let _ = stale.child.kill();
+                let _ = stale.child.wait();
+            }
+            if let Some(retry_at) = slot.retry_at {
+                let now = Instant::now();
+                if now < retry_at {
+                    return Err(BridgeDaemonError::Unavailable(format!(
+                        "{} (next start attempt in {}s)",
+                        slot.spawn_error,
+                        (retry_at - now).as_secs() + 1
+                    )));
+                }
+            }
+            let Some(command) = prepared.take() else {
+                drop(slot);
+                prepared = Some(bridge_daemon_command());
+                continue;
+            };
+            match command.and_then(spawn_bridge_daemon) {
+                Ok(daemon) => {
+                    slot.daemon = Some(daemon);
+                    slot.retry_at = None;
+                    slot.retry_backoff = Duration::ZERO;
+                }
+                Err(err) => {
+                    slot.retry_backoff = if slot.retry_backoff.is_zero() {
+                        BRIDGE_DAEMON_RETRY_MIN
+                    } else {
+                        (slot.retry_backoff * 2).min(BRIDGE_DAEMON_RETRY_MAX)
+                    };
+                    slot.retry_at = Some(Instant::now() + slot.retry_backoff);
+                    slot.spawn_error = err.clone();
+                    return Err(BridgeDaemonError::Unavailable(err));
+                }
+            }
+        }
+
+        let daemon = slot
+            .daemon
+            .as_mut()
+            .ok_or_else(|| BridgeDaemonError::Unavailable("Bridge daemon unavailable".to_string()))?;
+        if let Ok(mut pending) = daemon.pending.lock() {
+            pending.insert(request_id, sender.clone());
+        }
+
+        let write_result = writeln!(daemon.stdin, "{line}").and_then(|_| daemon.stdin.flush());
+        if let Err(err) = write_result {
+            daemon.alive.store(false, Ordering::SeqCst);
+            if let Ok(mut pending) = daemon.pending.lock() {
+                pending.remove(&request_id);
+            }
+            return Err(BridgeDaemonError::Unavailable(format!(
+                "Bridge daemon write failed: {err}"
+            )));
+        }
+
+        break (Arc::clone(&daemon.pending), Arc::clone(&daemon.alive));
+    };
+    drop(sender);
+
+    let response_timeout = bridge_response_timeout(action, payload);
+    match receiver.recv_timeout(response_timeout) {
+        Ok(value) => Ok(value),
+        Err(mpsc::RecvTimeoutError::Timeout) => {
+            if let Ok(mut pending) = pending.lock() {
+                pending.remove(&request_id);
+            }
+            // A daemon that misses its deadline may be wedged; the next call replaces it.
+            alive.store(false, Ordering::SeqCst);
+            Err(BridgeDaemonError::Failed(format!(
+                "Bridge daemon did not respond within {}s",
+                response_timeout.as_secs()
+            )))
+        }
+        Err(mpsc::RecvTimeoutError::Disconnected) => Err(BridgeDaemonError::Failed(
+            "Bridge daemon exited before responding".to_string(),
+        )),
+    }
+}
+
+#[tauri::command(async)]
 fn device_action(action: String, payload: Value) -> Result<Value, String> {
-    run_bridge(&action, &payload)
+    match run_bridge_daemon(&action, &payload) {
+        Ok(value) => Ok(value),
+        Err(BridgeDaemonError::Failed(err)) => Err(err),
+        Err(BridgeDaemonError::Unavailable(daemon_error)) => run_bridge(&action, &payload)
+            .map_err(|err| format!("{err}. Bridge daemon: {daemon_error}")),
+    }
 }
 
 #[tauri::command]
@@ -21,6 +21,7 @@ const LOCAL_WEB_BACKEND_URL = 'http://127.0.0.1:8765';
 const WEB_BACKEND_URL = WEB_CLOUD_BASE_URL || LOCAL_WEB_BACKEND_URL;
 const WEB_CLOUD_API_KEY = import.meta.env.VITE_CLOUD_API_KEY || '';
 const REMOTE_JOB_POLL_INTERVAL_MS = 1200;
+const REMOTE_JOB_WAIT_SECONDS = 20;
 const AGENT_STATUS_REFRESH_INTERVAL_MS = 15000;
 const TV_STATUS_REFRESH_INTERVAL_MS = 20000;
 const TIMESTAMP_MONITOR_REFRESH_INTERVAL_MS = 60000;
@@ -134,6 +135,9 @@ const WRITE_ACTIONS = new Set([
 ]);
 const TIMER_INDEXED_COMMANDS = new Set(['timer_13', 'timer_15']);
 const BULK_REFRESH_CONCURRENCY = 8;
+const REMOTE_GROUP_JOB_TIMEOUT_MS = 60000;
+// Targets per group heartbeat job; keeps each result well under the broker's 64KB cap.
+const REMOTE_GROUP_HEARTBEAT_MAX_TARGETS = 150;
 
 async function runInBatches(items, concurrency, worker) {
   const list = Array.isArray(items) ? items : [];
@@ -1290,8 +1294,37 @@ async function refreshAllSavedDeviceStatuses() {
   }
   renderSavedDeviceList(selectedSavedDeviceIp);
 
-  const statuses = await runInBatches(
-    refreshTargets,
+  // Devices behind an agent are checked with one group job per agent.
+  const localTargets = [];
+  const remoteTargetsByAgent = new Map();
+  for (const target of refreshTargets) {
+    const agentId = getDeviceAgentId(target.device);
+    if (!agentId) {
+      localTargets.push(target);
+      continue;
+    }
+    if (!remoteTargetsByAgent.has(agentId)) {
+      remoteTargetsByAgent.set(agentId, []);
+    }
+    remoteTargetsByAgent.get(agentId).push(target);
+  }
+
+  const remoteStatusesPromise = Promise.all(
+    [...remoteTargetsByAgent.entries()].map(async ([agentId, targets]) => {
+      const groupStatuses = await runRemoteGroupHeartbeat(agentId, targets);
+      return targets.map(({ deviceIp }) => {
+        const status = normalizeListStatus(groupStatuses.get(deviceIp));
+        setSavedDeviceRuntime(deviceIp, {
+          status,
+          lastChecked: formatUiTimestamp(),
+        });
+        return status;
+      });
+    }),
+  );
+
+  const localStatuses = await runInBatches(
+    localTargets,
     BULK_REFRESH_CONCURRENCY,
     async ({ device, deviceIp }) => {
       try {
@@ -1313,6 +1346,7 @@ async function refreshAllSavedDeviceStatuses() {
       }
     },
   );
+  const statuses = [...localStatuses, ...(await remoteStatusesPromise).flat()];
 
   let online = 0;
   let offline = 0;
@@ -1694,6 +1728,73 @@ function deriveTvHeartbeatStatus(result) {
   return 'offline';
 }
 
+async function runRemoteGroupHeartbeat(agentId, targets) {
+  const statuses = new Map();
+  const agentStatus = getAgentCachedStatus(agentId);
+  if (agentStatus !== 'online') {
+    for (const { deviceIp } of targets) {
+      statuses.set(deviceIp, 'offline');
+    }
+    return statuses;
+  }
+
+  const chunks = [];
+  for (let i = 0; i < targets.length; i += REMOTE_GROUP_HEARTBEAT_MAX_TARGETS) {
+    chunks.push(targets.slice(i, i + REMOTE_GROUP_HEARTBEAT_MAX_TARGETS));
+  }
+  await Promise.all(
+    chunks.map((chunk) => runRemoteGroupHeartbeatChunk(agentId, chunk, statuses)),
+  );
+  return statuses;
+}
+
+async function runRemoteGroupHeartbeatChunk(agentId, targets, statuses) {
+  try {
+    const queued = await enqueueRemoteJob(agentId, 'group', {
+      action: 'status',
+      payload: { priority: 'background' },
+      targets: targets.map(({ device, deviceIp }) => ({
+        ip: deviceIp,
+        port: Number(device?.port ?? 1515),
+        display_id: Number(device?.id ?? 0),
+      })),
+    });
+    const completed = await pollRemoteJob(
+      queued.job_id,
+      REMOTE_GROUP_JOB_TIMEOUT_MS,
+    );
+    if (completed?.result?.truncated) {
+      // The broker kept only a size marker; the per-device outcomes are gone.
+      const message = `Remote status for ${targets.length} device(s) on agent ${agentId} exceeded the broker result limit (${completed.result.size_bytes} > ${completed.result.limit_bytes} bytes)`;
+      logLine(message);
+      showToast(message, 'error');
+    }
+    const results = completed?.result?.data?.results;
+    for (const item of Array.isArray(results) ? results : []) {
+      const target = targets[Number(item?.index)];
+      if (!target) {
+        continue;
+      }
+      const normalized = normalizeActionResult(
+        'status',
+        `remote:${agentId}`,
+        item,
+      );
+      statuses.set(target.deviceIp, deriveTvHeartbeatStatus(normalized));
+    }
+  } catch (error) {
+    const errorText = stringifyError(error);
+    const fallback = isBackendUnavailableErrorText(errorText)
+      ? 'unknown'
+      : 'offline';
+    for (const { deviceIp } of targets) {
+      if (!statuses.has(deviceIp)) {
+        statuses.set(deviceIp, fallback);
+      }
+    }
+  }
+}
+
 async function runSingleTvHeartbeat(device) {
   const tvIp = getSavedDeviceIp(device);
   if (!tvIp) {
@@ -1706,7 +1807,7 @@ async function runSingleTvHeartbeat(device) {
     port: Number(device?.port ?? 1515),
     display_id: Number(device?.id ?? 0),
     protocol: String(device?.protocol ?? 'AUTO'),
-    timeout_s: 20,
+    priority: 'background',
   };
 
   const agentId = getDeviceAgentId(device);
@@ -2958,6 +3059,9 @@ function buildRemoteJobFromAction(action, payload) {
     port: Number(payload?.port ?? 1515),
     protocol: String(payload?.protocol ?? 'AUTO'),
   };
+  if (payload?.priority) {
+    basePayload.priority = String(payload.priority);
+  }
 
   if (normalizedAction === 'status') {
     return {
@@ -3006,6 +3110,21 @@ function buildRemoteJobFromAction(action, payload) {
     };
   }
 
+  if (normalizedAction === 'snapshot') {
+    const commands = Array.isArray(payload?.commands) ? payload.commands : [];
+    if (!commands.length) {
+      return { ok: false, error: 'Remote snapshot requires commands.' };
+    }
+    return {
+      ok: true,
+      kind: 'mdc_snapshot',
+      payload: {
+        ...basePayload,
+        commands,
+      },
+    };
+  }
+
   if (normalizedAction === 'set_volume') {
     return {
       ok: true,
@@ -3068,9 +3187,17 @@ async function pollRemoteJob(jobId, timeoutMs) {
   const startedAt = Date.now();
 
   while (Date.now() - startedAt < timeoutMs) {
+    // Blocking read: the backend holds the request until the job finishes or
+    // `wait` seconds pass, so no client-side polling delay is added.
+    const remainingMs = timeoutMs - (Date.now() - startedAt);
+    const waitSeconds = Math.max(
+      1,
+      Math.min(REMOTE_JOB_WAIT_SECONDS, Math.floor(remainingMs / 1000)),
+    );
+    const requestStartedAt = Date.now();
     const response = await fetchJsonWithTimeout(
-      `${WEB_BACKEND_URL}/api/remote/jobs/${encodeURIComponent(jobId)}`,
-      10000,
+      `${WEB_BACKEND_URL}/api/remote/jobs/${encodeURIComponent(jobId)}?wait=${waitSeconds}`,
+      waitSeconds * 1000 + 10000,
       remoteHeaders(),
     );
 
@@ -3088,13 +3215,16 @@ async function pollRemoteJob(jobId, timeoutMs) {
       return body;
     }
 
-    if (body.status === 'failed') {
+    if (body.status === 'failed' || body.status === 'dead_letter') {
       throw new Error(body.error || body.detail || 'Remote execution failed');
     }
 
-    await new Promise((resolve) =>
-      window.setTimeout(resolve, REMOTE_JOB_POLL_INTERVAL_MS),
-    );
+    // Only back off when the backend answered without holding (older backend).
+    if (Date.now() - requestStartedAt < waitSeconds * 1000) {
+      await new Promise((resolve) =>
+        window.setTimeout(resolve, REMOTE_JOB_POLL_INTERVAL_MS),
+      );
+    }
   }
 
   throw new Error(